@@ -1,5 +1,26 @@
+"""
+Build script for the loxmqttrelay Rust extension.
+
+Profile-Guided Optimization (opt-in, Rust extension only):
+
+    1. LOXMQTT_PGO=generate pip install .
+       -> instrumented build, profiles are written to LOXMQTT_PGO_DIR (default /tmp/loxpgo)
+    2. Run the relay against a representative MQTT/UDP load (e.g. a replay of a real broker)
+    3. llvm-profdata merge -o /tmp/loxpgo/merged.profdata /tmp/loxpgo
+    4. LOXMQTT_PGO=use pip install .
+       -> optimized build using /tmp/loxpgo/merged.profdata
+
+Without LOXMQTT_PGO the build is unchanged.
+
+Local-only native build (not redistributable):
+
+    LOXMQTT_NATIVE=1 pip install .
+       -> every tier is compiled with target-cpu=native for the build host.
+          Never use this for wheels/images that run on other machines.
+"""
 from setuptools import find_packages, setup
 from setuptools_rust import Binding, RustExtension
+import os
 import platform
 import logging
 
@@ -25,37 +46,57 @@ logger.info(f"Detected platform: {arch}")
 
 rust_extensions = []
 
-# AMD64 optimierte und kompatible Builds
+# Fat LTO nur auf Wunsch - deutlich längere Build-Zeit als das thin LTO aus Cargo.toml
+if os.environ.get("LOXMQTT_FAT_LTO"):
+    logger.info("Fat LTO enabled via LOXMQTT_FAT_LTO")
+    os.environ["CARGO_PROFILE_RELEASE_LTO"] = "fat"
+
+# Ein einziges Extension-Artefakt pro Plattform. Auf x86-64 ist die Baseline
+# x86-64-v2 (SSE4.2/POPCNT); AVX2/AVX-512 Pfade werden in src/lib.rs zur Laufzeit
+# per is_x86_feature_detected! ausgewählt (siehe multiversion!)
 if arch in ("x86_64", "amd64"):
-    logger.info("Building for AMD64 architecture - optimized & compatible versions")
-    
-    rust_extensions.append(
-        RustExtension(
-            "loxmqttrelay.optimized._loxmqttrelay",
-            path="Cargo.toml",
-            binding=Binding.PyO3,
-            rustc_flags=["-C", "opt-level=3", "-C", "target-cpu=native"]
-        )
-    )
-    
-    rust_extensions.append(
-        RustExtension(
-            "loxmqttrelay.compatible._loxmqttrelay",
-            path="Cargo.toml",
-            binding=Binding.PyO3,
-            rustc_flags=["-C", "opt-level=2", "-C", "target-cpu=generic"]
-        )
-    )
+    logger.info("Building for AMD64 architecture - x86-64-v2 baseline with runtime AVX2/AVX-512 dispatch")
+    rustc_flags = ["-C", "opt-level=3", "-C", "target-cpu=x86-64-v2"]
+elif arch in ("aarch64", "arm64"):
+    # NEON ist Teil der aarch64-Baseline, generic bleibt daher portabel und wird voll optimiert
+    logger.info("Building for ARM64 architecture")
+    rustc_flags = ["-C", "opt-level=3", "-C", "target-cpu=generic"]
+else:
+    # Keine x86-spezifischen Flags auf fremden Architekturen (armv7, ppc64le, riscv64, ...)
+    logger.info("Building for non-AMD64 architecture")
+    rustc_flags = ["-C", "opt-level=2", "-C", "target-cpu=generic"]
+
+# target-cpu=native nur für lokale Builds - oben stehen bewusst feste
+# Microarchitecture-Levels, damit Wheels nicht auf älteren CPUs mit SIGILL abstürzen
+if os.environ.get("LOXMQTT_NATIVE"):
+    logger.warning("LOXMQTT_NATIVE set - building for target-cpu=native, the result is not redistributable")
+    rustc_flags = [flag if not flag.startswith("target-cpu=") else "target-cpu=native" for flag in rustc_flags]
+
+# Profile-Guided Optimization (siehe Docstring)
+pgo_mode = os.environ.get("LOXMQTT_PGO", "").lower()
+pgo_dir = os.environ.get("LOXMQTT_PGO_DIR", "/tmp/loxpgo")
+if pgo_mode == "generate":
+    logger.info(f"PGO: building instrumented extension, profiles go to {pgo_dir}")
+    pgo_flags = ["-C", f"profile-generate={pgo_dir}"]
+elif pgo_mode == "use":
+    profdata = os.path.join(pgo_dir, "merged.profdata")
+    if not os.path.exists(profdata):
+        raise RuntimeError(f"LOXMQTT_PGO=use but {profdata} does not exist - run llvm-profdata merge first")
+    logger.info(f"PGO: using profile data {profdata}")
+    pgo_flags = ["-C", f"profile-use={profdata}", "-C", "llvm-args=-pgo-warn-missing-function"]
+elif pgo_mode:
+    raise RuntimeError(f"Invalid LOXMQTT_PGO value '{pgo_mode}' - expected 'generate' or 'use'")
 else:
-    logger.info("Building for non-AMD64 architecture - compatible version only")
-    rust_extensions.append(
-        RustExtension(
-            "loxmqttrelay.compatible._loxmqttrelay",
-            path="Cargo.toml",
-            binding=Binding.PyO3,
-            rustc_flags=["-C", "opt-level=2", "-C", "target-cpu=generic"]
-        )
+    pgo_flags = []
+
+rust_extensions.append(
+    RustExtension(
+        "loxmqttrelay._loxmqttrelay",
+        path="Cargo.toml",
+        binding=Binding.PyO3,
+        rustc_flags=rustc_flags + pgo_flags
     )
+)
 
 ################################################################################
 # Combined Setup call (Rust extensions only)
@@ -1,9 +1,10 @@
-use pyo3::{prelude::*, types::PyFrozenSet};
+use pyo3::prelude::*;
 use regex::Regex;
 use pyo3::intern;
 
-use std::collections::HashSet;
-use std::sync::Mutex;
+use std::collections::{HashMap, HashSet};
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::{Mutex, OnceLock};
 
 // For caching
 use lru::LruCache;
@@ -19,19 +20,17 @@ use base64::{Engine, engine::general_purpose};
 // Import `into_future` from pyo3_async_runtimes and `spawn` from tokio
 use pyo3_async_runtimes::tokio::into_future;
 
-/// A small struct to store all relevant MQTT topics in Rust, so we don't fetch them repeatedly
-#[derive(Clone, Debug)]
-struct MqttTopics {
-    start_ui_topic: String,
-    stop_ui_topic: String,
-    miniserver_startup_topic: String,
-    config_get_topic: String,
-    config_response_topic: String,
-    config_set_topic: String,
-    config_add_topic: String,
-    config_remove_topic: String,
-    config_update_topic: String,
-    config_restart_topic: String,
+/// What to do with a message on one of the relay's own control topics. The topic strings are
+/// fetched from Python once and mapped to their action, so dispatch is a single hash lookup.
+#[derive(Clone, Copy, Debug)]
+enum ControlAction {
+    MiniserverStartup,
+    StartUi,
+    StopUi,
+    ConfigGet,
+    /// config/set, config/add, config/remove with the list mode passed to update_fields
+    ConfigUpdate(&'static str),
+    Restart,
 }
 
 /// Convert a known boolean string to "1"/"0", or None if unrecognized.
@@ -44,63 +43,154 @@ fn convert_boolean_str(input: &str) -> Option<&'static str> {
     }
 }
 
-/// Flatten a serde_json `Value` into `key/value` pairs using '/' as separator.
-fn flatten_json(obj: &Value, prefix: &str, acc: &mut Vec<(String, String)>) {
-    match obj {
-        Value::Object(map) => {
-            for (k, v) in map {
-                let new_key = if prefix.is_empty() {
-                    k.clone()
-                } else {
-                    format!("{}/{}", prefix, k)
-                };
-                match v {
-                    Value::Object(_) | Value::Array(_) => {
-                        flatten_json(v, &new_key, acc);
-                    }
-                    Value::String(s) => {
-                        acc.push((new_key, s.clone()));
-                    }
-                    Value::Number(num) => {
-                        acc.push((new_key, num.to_string()));
-                    }
-                    Value::Bool(b) => {
-                        acc.push((new_key, b.to_string()));
+/// Map a payload to "1"/"0" if it is a known boolean word (case-insensitive, surrounding whitespace ignored).
+/// Words are at most 8 bytes, longer payloads are rejected without being lowercased or copied.
+fn convert_boolean_value(val: &str) -> Option<&'static str> {
+    let trimmed = val.trim().as_bytes();
+    if trimmed.is_empty() || trimmed.len() > 8 {
+        return None;
+    }
+    let mut buf = [0u8; 8];
+    let lower = &mut buf[..trimmed.len()];
+    lower.copy_from_slice(trimmed);
+    lower.make_ascii_lowercase();
+    convert_boolean_str(std::str::from_utf8(lower).ok()?)
+}
+
+/// Function multiversioning for the hot string kernels.
+///
+/// The body of each kernel is compiled once per x86 ISA level (`#[target_feature]`) plus a
+/// portable fallback. The best variant for the running CPU is chosen on first use via
+/// `is_x86_feature_detected!` and cached as a plain function pointer in a `OnceLock`, so every
+/// later call is a single indirect call - no Python-side dispatch and one binary for all CPUs.
+macro_rules! multiversion {
+    ($(#[$meta:meta])* $vis:vis fn $name:ident($($arg:ident: $ty:ty),*) -> $ret:ty $body:block) => {
+        $(#[$meta])*
+        $vis fn $name($($arg: $ty),*) -> $ret {
+            #[inline(always)]
+            fn generic($($arg: $ty),*) -> $ret $body
+
+            #[cfg(target_arch = "x86_64")]
+            #[target_feature(enable = "avx2")]
+            unsafe fn avx2($($arg: $ty),*) -> $ret { generic($($arg),*) }
+
+            #[cfg(target_arch = "x86_64")]
+            #[target_feature(enable = "avx512f,avx512bw")]
+            unsafe fn avx512($($arg: $ty),*) -> $ret { generic($($arg),*) }
+
+            #[cfg(target_arch = "x86_64")]
+            fn avx2_entry($($arg: $ty),*) -> $ret { unsafe { avx2($($arg),*) } }
+
+            #[cfg(target_arch = "x86_64")]
+            fn avx512_entry($($arg: $ty),*) -> $ret { unsafe { avx512($($arg),*) } }
+
+            static SELECTED: OnceLock<fn($($ty),*) -> $ret> = OnceLock::new();
+            let kernel = SELECTED.get_or_init(|| {
+                #[cfg(target_arch = "x86_64")]
+                {
+                    if is_x86_feature_detected!("avx512f") && is_x86_feature_detected!("avx512bw") {
+                        debug!("{}: using avx512 kernel", stringify!($name));
+                        return avx512_entry;
                     }
-                    Value::Null => {
-                        acc.push((new_key, "null".to_string()));
+                    if is_x86_feature_detected!("avx2") {
+                        debug!("{}: using avx2 kernel", stringify!($name));
+                        return avx2_entry;
                     }
                 }
-            }
+                debug!("{}: using generic kernel", stringify!($name));
+                generic
+            });
+            kernel($($arg),*)
         }
-        Value::Array(arr) => {
-            for (i, item) in arr.iter().enumerate() {
-                let new_key = if prefix.is_empty() {
-                    i.to_string()
-                } else {
-                    format!("{}/{}", prefix, i)
-                };
-                match item {
-                    Value::Object(_) | Value::Array(_) => {
-                        flatten_json(item, &new_key, acc);
-                    }
-                    Value::String(s) => {
-                        acc.push((new_key, s.clone()));
-                    }
-                    Value::Number(num) => {
-                        acc.push((new_key, num.to_string()));
-                    }
-                    Value::Bool(b) => {
-                        acc.push((new_key, b.to_string()));
-                    }
-                    Value::Null => {
-                        acc.push((new_key, "null".to_string()));
-                    }
+    };
+}
+
+#[inline(always)]
+fn is_topic_separator(b: u8) -> bool {
+    b == b'/' || b == b'%'
+}
+
+multiversion! {
+    /// Replace every '/' and '%' in `topic` with '_'. Returns None if there is nothing to replace.
+    /// Single pass: the clean prefix up to the first separator is copied as is, only the rest is mapped.
+    fn replace_topic_separators(topic: &str) -> Option<String> {
+        let bytes = topic.as_bytes();
+        let first = bytes.iter().position(|&b| is_topic_separator(b))?;
+        let mut replaced = Vec::with_capacity(bytes.len());
+        replaced.extend_from_slice(&bytes[..first]);
+        replaced.extend(
+            bytes[first..]
+                .iter()
+                .map(|&b| if is_topic_separator(b) { b'_' } else { b }),
+        );
+        // Only ASCII bytes are swapped for ASCII bytes, so the result is still valid UTF-8
+        Some(unsafe { String::from_utf8_unchecked(replaced) })
+    }
+}
+
+/// Append `segment` to `prefix` with '/' as separator.
+#[inline]
+fn join_key(prefix: &str, segment: &str) -> String {
+    if prefix.is_empty() {
+        return segment.to_string();
+    }
+    let mut key = String::with_capacity(prefix.len() + 1 + segment.len());
+    key.push_str(prefix);
+    key.push('/');
+    key.push_str(segment);
+    key
+}
+
+/// Flatten a serde_json `Value` into `key/value` pairs using '/' as separator, keys start with `prefix`.
+/// Walks the tree with an explicit stack, so deep payloads need no recursion and every key is built once.
+fn flatten_json(obj: &Value, prefix: &str, acc: &mut Vec<(String, String)>) {
+    let mut stack: Vec<(String, &Value)> = Vec::new();
+    match obj {
+        Value::Object(_) | Value::Array(_) => stack.push((prefix.to_string(), obj)),
+        _ => return,
+    }
+    while let Some((key, value)) = stack.pop() {
+        match value {
+            // Children are pushed in reverse, so pairs come out in document order
+            Value::Object(map) => {
+                for (k, v) in map.iter().rev() {
+                    stack.push((join_key(&key, k), v));
+                }
+            }
+            Value::Array(arr) => {
+                for (i, v) in arr.iter().enumerate().rev() {
+                    stack.push((join_key(&key, &i.to_string()), v));
                 }
             }
+            Value::String(s) => acc.push((key, s.clone())),
+            Value::Number(num) => acc.push((key, num.to_string())),
+            Value::Bool(b) => acc.push((key, b.to_string())),
+            Value::Null => acc.push((key, "null".to_string())),
+        }
+    }
+}
+
+/// Flatten a JSON object payload into (topic/key, value) pairs, anything else is returned as the single pair.
+/// Only objects are flattened, so the first non-whitespace byte decides whether the parser runs at all:
+/// plain values like "21.5" or "on", the bulk of MQTT traffic, never reach serde_json.
+fn expand_payload(topic: &str, payload: &str) -> Vec<(String, String)> {
+    let body = payload.trim_start_matches(|c: char| matches!(c, ' ' | '\t' | '\n' | '\r'));
+    if body.as_bytes().first() == Some(&b'{') {
+        if let Ok(json_val @ Value::Object(_)) = serde_json::from_str::<Value>(body) {
+            let mut flattened = Vec::new();
+            flatten_json(&json_val, topic, &mut flattened);
+            return flattened;
         }
-        _ => {}
     }
+    vec![(topic.to_string(), payload.to_string())]
+}
+
+/// Normalize whitelist entries once, so lookups never have to normalize the stored side.
+fn normalize_whitelist(whitelist: Vec<String>) -> HashSet<String> {
+    whitelist
+        .into_iter()
+        .map(|entry| replace_topic_separators(&entry).unwrap_or(entry))
+        .collect()
 }
 
 macro_rules! pyget {
@@ -111,29 +201,35 @@ macro_rules! pyget {
     }};
 }
 
-/// Private helper function to compile regex filters
-fn compile_filters(filters: Vec<String>) -> Option<Regex> {
-    if filters.is_empty() {
-        debug!("No filters provided.");
-        return None;
-    }
-    let mut valid_filters = Vec::new();
-    for flt in filters {
-        match Regex::new(&flt) {
+/// Private helper function to drop (and log) filters that are not valid regexes
+fn validate_filters(filters: Vec<String>) -> Vec<String> {
+    filters
+        .into_iter()
+        .filter(|flt| match Regex::new(flt) {
             Ok(_) => {
                 debug!("Filter '{}' is valid", flt);
-                valid_filters.push(flt);
+                true
             }
             Err(e) => {
                 error!("Invalid filter '{}': {}", flt, e);
+                false
             }
-        }
-    }
-    if valid_filters.is_empty() {
-        debug!("No valid filters found.");
+        })
+        .collect()
+}
+
+/// Private helper function to compile validated regex filters into one alternation
+fn compile_filters(filters: &[String]) -> Option<Regex> {
+    if filters.is_empty() {
+        debug!("No filters provided.");
         return None;
     }
-    let pattern = format!("({})", valid_filters.join("|"));
+    // Every filter keeps its own group, so inline flags or '|' in one filter cannot leak into the others
+    let pattern = filters
+        .iter()
+        .map(|flt| format!("(?:{})", flt))
+        .collect::<Vec<_>>()
+        .join("|");
     match Regex::new(&pattern) {
         Ok(compiled_regex) => Some(compiled_regex),
         Err(e) => {
@@ -148,13 +244,17 @@ pub struct MiniserverDataProcessor {
     #[pyo3(get)]
     global_config: Py<PyAny>,
 
+    subscription_filters: Vec<String>,
+    do_not_forward_filters: Vec<String>,
+
+    /// First pass, applied to the incoming topic
     compiled_subscription_filter: Option<Regex>,
-    
-    do_not_forward_patterns: Option<Regex>,
+    /// Second pass, applied to every flattened topic: subscription filters and do_not_forward fused
+    /// into one regex, so each topic is scanned once instead of twice
+    compiled_reject_filter: Option<Regex>,
 
     #[pyo3(get)]
     topic_whitelist: HashSet<String>,
-    convert_bool_cache: Mutex<LruCache<String, String>>,
     normalize_topic_cache: Mutex<LruCache<String, String>>,
 
     relay_main_obj: Py<PyAny>,
@@ -162,8 +262,12 @@ pub struct MiniserverDataProcessor {
     #[pyo3(get)]
     http_handler_obj: Py<PyAny>,
     orjson_obj: Py<PyAny>,
-    mqtt_topics: Option<MqttTopics>,
+    control_topics: HashMap<String, ControlAction>,
+    config_response_topic: String,
     base_topic: String,
+    /// processing.expand_json, cached so the hot path does not walk global_config per message.
+    /// Atomic so reload_config() can refresh it through &self while a message is being handled
+    expand_json: AtomicBool,
 }
 
 #[pymethods]
@@ -177,7 +281,8 @@ impl MiniserverDataProcessor {
             pyget!(global_config_py, py, "general", "cache_size").extract::<i32>()?
         );
 
-        let compiled = compile_filters(pyget!(global_config_py, py, "topics", "subscription_filters").extract()?);
+        let subscription_filters = validate_filters(pyget!(global_config_py, py, "topics", "subscription_filters").extract()?);
+        let do_not_forward_filters = validate_filters(pyget!(global_config_py, py, "topics", "do_not_forward").extract()?);
         let cache_size = if pyget!(global_config_py, py, "general", "cache_size").extract::<i32>()? == 0 {
             64
         } else {
@@ -185,64 +290,70 @@ impl MiniserverDataProcessor {
         };
         let lru_size = NonZeroUsize::new(cache_size).unwrap();
         let base_topic: String = pyget!(global_config_py, py, "general", "base_topic").extract()?;
-        let start_ui_topic: String = topic_ns.bind(py).getattr(intern!(py, "START_UI"))?.extract()?;
-        let stop_ui_topic: String = topic_ns.bind(py).getattr(intern!(py, "STOP_UI"))?.extract()?;
-        let miniserver_startup_topic: String = topic_ns.bind(py).getattr(intern!(py, "MINISERVER_STARTUP_EVENT"))?.extract()?;
-        let config_get_topic: String = topic_ns.bind(py).getattr(intern!(py, "CONFIG_GET"))?.extract()?;
+        let expand_json: bool = pyget!(global_config_py, py, "processing", "expand_json").extract()?;
+        let control_topics = [
+            ("START_UI", ControlAction::StartUi),
+            ("STOP_UI", ControlAction::StopUi),
+            ("MINISERVER_STARTUP_EVENT", ControlAction::MiniserverStartup),
+            ("CONFIG_GET", ControlAction::ConfigGet),
+            ("CONFIG_SET", ControlAction::ConfigUpdate("set")),
+            ("CONFIG_ADD", ControlAction::ConfigUpdate("add")),
+            ("CONFIG_REMOVE", ControlAction::ConfigUpdate("remove")),
+            ("CONFIG_UPDATE", ControlAction::Restart),
+            ("CONFIG_RESTART", ControlAction::Restart),
+        ]
+        .into_iter()
+        .map(|(name, action)| -> PyResult<(String, ControlAction)> {
+            Ok((topic_ns.bind(py).getattr(name)?.extract()?, action))
+        })
+        .collect::<PyResult<HashMap<String, ControlAction>>>()?;
         let config_response_topic: String = topic_ns.bind(py).getattr(intern!(py, "CONFIG_RESPONSE"))?.extract()?;
-        let config_set_topic: String = topic_ns.bind(py).getattr(intern!(py, "CONFIG_SET"))?.extract()?;
-        let config_add_topic: String = topic_ns.bind(py).getattr(intern!(py, "CONFIG_ADD"))?.extract()?;
-        let config_remove_topic: String = topic_ns.bind(py).getattr(intern!(py, "CONFIG_REMOVE"))?.extract()?;
-        let config_update_topic: String = topic_ns.bind(py).getattr(intern!(py, "CONFIG_UPDATE"))?.extract()?;
-        let config_restart_topic: String = topic_ns.bind(py).getattr(intern!(py, "CONFIG_RESTART"))?.extract()?;
-
-        let topics = MqttTopics {
-            start_ui_topic,
-            stop_ui_topic,
-            miniserver_startup_topic,
-            config_get_topic,
-            config_response_topic,
-            config_set_topic,
-            config_add_topic,
-            config_remove_topic,
-            config_update_topic,
-            config_restart_topic,
-        };
-        // processor.mqtt_topics = Some(topics);
 
-
-        let processor = MiniserverDataProcessor {
-            compiled_subscription_filter: compiled,
-            do_not_forward_patterns: None,
-            topic_whitelist: pyget!(global_config_py, py, "topics", "topic_whitelist")
-                .extract::<Vec<String>>()?
-                .into_iter()
-                .collect(),
-            convert_bool_cache: Mutex::new(LruCache::new(lru_size)),
+        let mut processor = MiniserverDataProcessor {
+            subscription_filters,
+            do_not_forward_filters,
+            compiled_subscription_filter: None,
+            compiled_reject_filter: None,
+            topic_whitelist: normalize_whitelist(
+                pyget!(global_config_py, py, "topics", "topic_whitelist").extract::<Vec<String>>()?,
+            ),
             normalize_topic_cache: Mutex::new(LruCache::new(lru_size)),
             global_config: global_config_py,
-            mqtt_topics: Some(topics),
+            control_topics,
+            config_response_topic,
             relay_main_obj,
             mqtt_client_obj,
             http_handler_obj,
             orjson_obj,
             base_topic:base_topic,
+            expand_json: AtomicBool::new(expand_json),
         };
 
-  
+        processor.rebuild_filters();
+
         debug!("MiniserverDataProcessor initialization complete");
         Ok(processor)
     }
 
+    /// Re-read the cached processing flags from global_config after it was changed at runtime.
+    #[pyo3(text_signature = "(self)")]
+    fn reload_config(&self, py: Python) -> PyResult<()> {
+        let expand_json: bool = pyget!(self.global_config, py, "processing", "expand_json").extract()?;
+        self.expand_json.store(expand_json, Ordering::Relaxed);
+        debug!("Reloaded processing config: expand_json={}", expand_json);
+        Ok(())
+    }
+
     #[pyo3(text_signature = "(self, filters)")]
     fn update_subscription_filters(&mut self, filters: Vec<String>) {
         debug!("Updating subscription filters: {:?}", filters);
-        self.compiled_subscription_filter = compile_filters(filters);
+        self.subscription_filters = validate_filters(filters);
+        self.rebuild_filters();
     }
 
     #[pyo3(text_signature = "(self, whitelist)")]
     fn update_topic_whitelist(&mut self, whitelist: Vec<String>) {
-        let set: HashSet<String> = whitelist.into_iter().collect();
+        let set = normalize_whitelist(whitelist);
         debug!("Updating topic whitelist: {:?}", set);
         self.topic_whitelist = set;
     }
@@ -250,28 +361,15 @@ impl MiniserverDataProcessor {
     #[pyo3(text_signature = "(self, filters)")]
     fn update_do_not_forward(&mut self, filters: Vec<String>) {
         debug!("Updating do_not_forward filters: {:?}", filters);
-        self.do_not_forward_patterns = compile_filters(filters);
+        self.do_not_forward_filters = validate_filters(filters);
+        self.rebuild_filters();
     }
 
     
 
     #[pyo3(text_signature = "(self, val)")]
-    fn _convert_boolean(&self, val: &str) -> PyResult<Option<String>> {
-        let mut cache = self.convert_bool_cache.lock().unwrap();
-        if let Some(cached) = cache.get(val) {
-            return Ok(Some(cached.clone()));
-        }
-        if val.is_empty() {
-            return Ok(Some(val.to_string()));
-        }
-        let normalized = val.trim().to_lowercase();
-        if let Some(mapped) = convert_boolean_str(&normalized) {
-            cache.put(val.to_string(), mapped.to_string());
-            Ok(Some(mapped.to_string()))
-        } else {
-            cache.put(val.to_string(), val.to_string());
-            Ok(Some(val.to_string()))
-        }
+    fn _convert_boolean(&self, val: &str) -> String {
+        convert_boolean_value(val).unwrap_or(val).to_string()
     }
 
     #[pyo3(text_signature = "(self, topic)")]
@@ -280,50 +378,23 @@ impl MiniserverDataProcessor {
         if let Some(cached) = cache.get(topic) {
             return Ok(cached.clone());
         }
-        if !topic.contains('/') && !topic.contains('%') {
-            cache.put(topic.to_string(), topic.to_string());
-            return Ok(topic.to_string());
-        }
-        let normalized = topic.replace('/', "_").replace('%', "_");
+        let normalized = replace_topic_separators(topic).unwrap_or_else(|| topic.to_string());
         cache.put(topic.to_string(), normalized.clone());
         Ok(normalized)
     }
 
+    /// Returns the flattened (topic, value) pairs as a list in document order; callers only iterate,
+    /// so there is no point in hashing every pair into a set.
     #[pyo3(text_signature = "(self, topic, val)")]
-    fn expand_json(&self, py: Python, topic: &str, val: &str) -> PyResult<Py<PyFrozenSet>> {
-        if val.is_empty() || ((!val.starts_with('{')) && (!val.starts_with('['))) {
-            let tuple = (topic.to_string(), val.to_string());
-            let set = PyFrozenSet::new(py, &[tuple])?;
-            return Ok(set.into());
-        }
-        match serde_json::from_str::<Value>(val) {
-            Ok(json_val) => {
-                if !json_val.is_object() {
-                    let tuple = (topic.to_string(), val.to_string());
-                    let set = PyFrozenSet::new(py, &[tuple])?;
-                    return Ok(set.into());
-                }
-                let mut flattened = Vec::new();
-                flatten_json(&json_val, "", &mut flattened);
-                let results: Vec<(String, String)> = flattened
-                    .into_iter()
-                    .map(|(k, v)| (format!("{}/{}", topic, k), v))
-                    .collect();
-                let set = PyFrozenSet::new(py, &results)?;
-                Ok(set.into())
-            }
-            Err(_) => {
-                let tuple = (topic.to_string(), val.to_string());
-                let set = PyFrozenSet::new(py, &[tuple])?;
-                Ok(set.into())
-            }
-        }
+    fn expand_json(&self, topic: &str, val: &str) -> Vec<(String, String)> {
+        expand_payload(topic, val)
     }
 
     #[pyo3(text_signature = "(self, topic)")]
-    fn is_in_whitelist(&self, topic: &str) -> PyResult<bool> {
-        let normalized = self.normalize_topic(topic)?;
-        Ok(self.topic_whitelist.contains(&normalized))
+    fn is_in_whitelist(&self, topic: &str) -> bool {
+        // Entries are stored normalized, so a topic without separators is looked up as is
+        self.topic_whitelist.contains(topic)
+            || replace_topic_separators(topic).is_some_and(|normalized| self.topic_whitelist.contains(&normalized))
     }
 
     #[pyo3(text_signature = "(self, topic, message)")]
@@ -347,28 +418,18 @@ impl MiniserverDataProcessor {
             }
         }
 
-        let expand = pyget!(self.global_config, py, "processing", "expand_json").extract()?;
+        let expand = self.expand_json.load(Ordering::Relaxed);
         debug!("Transforming data with expand_json={}", expand);
 
         let flattened: Vec<(String, String)> = if expand {
-            match serde_json::from_str::<Value>(message) {
-                Ok(json_val) => {
-                    if !json_val.is_object() {
-                        vec![(topic.to_string(), message.to_string())]
-                    } else {
-                        let mut flat_vec = Vec::new();
-                        flatten_json(&json_val, "", &mut flat_vec);
-                        flat_vec.into_iter().map(|(k, v)| (format!("{}/{}", topic, k), v)).collect()
-                    }
-                }
-                Err(_) => vec![(topic.to_string(), message.to_string())],
-            }
+            expand_payload(topic, message)
         } else {
             vec![(topic.to_string(), message.to_string())]
         };
         debug!("Data after flattening: {:?}", flattened);
 
-        // Loop for sending topics to the miniserver asynchronously
+        // Collect everything that passes the filters, it is handed to Python in one call below
+        let mut batch: Vec<(String, String, String)> = Vec::with_capacity(flattened.len());
         for (t, v) in flattened {
             // Check whitelist first (using normalized topic)
             let cur_t_normalized = self.normalize_topic(&t)?;
@@ -383,43 +444,41 @@ impl MiniserverDataProcessor {
                 debug!("Topic '{}' (normalized: '{}') found in whitelist", t, cur_t_normalized);
             }
             
-            // second pass subscription filter (on original topic)
-            if let Some(ref regex) = self.compiled_subscription_filter {
-                if regex.is_match(&t) {
-                    debug!("Topic '{}' filtered by second pass", t);
-                    continue;
-                }
-            }
-            
-            // do_not_forward (on original topic)
-            if let Some(ref regex) = self.do_not_forward_patterns {
+            // second pass subscription filter and do_not_forward (on original topic), one scan
+            if let Some(ref regex) = self.compiled_reject_filter {
                 if regex.is_match(&t) {
-                    debug!("Topic '{}' filtered by do_not_forward", t);
+                    debug!("Topic '{}' filtered by second pass or do_not_forward", t);
                     continue;
                 }
             }
             
             debug!("Topic '{}' passed all filters, sending to miniserver", t);
-            let converted = self._convert_boolean(&v)?;
-            if let Some(val) = converted {
-                let coro = self
-                    .http_handler_obj
-                    .bind(py)
-                    .call_method1("send_to_miniserver", (t, cur_t_normalized, val))?;
-                let fut = into_future(coro.clone())?;
-                pyo3_async_runtimes::tokio::get_runtime().spawn(async move {
-                    if let Err(e) = fut.await {
-                        error!("Error in send_to_miniserver async call: {:?}", e);
-                    }
-                });
-            }
+            // No cache: the lookup is a bounded match, cheaper than hashing into a locked LRU
+            let val = convert_boolean_value(&v).map_or(v, str::to_string);
+            batch.push((t, cur_t_normalized, val));
         }
 
+        // One coroutine and one spawned task per message: a single value goes through
+        // send_to_miniserver, flattened JSON through send_many_to_miniserver. Both use the
+        // handler's bounded batching queue, so every value shares its backpressure and shutdown drain
+        let handler = self.http_handler_obj.bind(py);
+        let coro = match batch.len() {
+            0 => return Ok(()),
+            1 => handler.call_method1("send_to_miniserver", batch.pop().unwrap())?,
+            _ => handler.call_method1("send_many_to_miniserver", (batch,))?,
+        };
+        let fut = into_future(coro)?;
+        pyo3_async_runtimes::tokio::get_runtime().spawn(async move {
+            if let Err(e) = fut.await {
+                error!("Error in send_to_miniserver async call: {:?}", e);
+            }
+        });
+
         Ok(())
     }
 
     /// Equivalent of the old `received_mqtt_message`, but now inside MiniserverDataProcessor.
-    /// Because we already stored all topic strings in `mqtt_topics`, we do not repeatedly
+    /// Because we already stored all topic strings in `control_topics`, we do not repeatedly
     /// fetch them from Python on every call. Much more efficient.
     ///
     /// Called in Python via partial:
@@ -455,89 +514,84 @@ impl MiniserverDataProcessor {
 
         debug!("(Rust) handle_mqtt_message: {} => {}", topic, message);
 
-        let Some(ref topics) = self.mqtt_topics else {
-            error!("mqtt_topics was never initialized!");
-            return Ok(()); 
-        };
         if topic.starts_with(&self.base_topic) {
-        // Match the topic to whichever action it needs
-            if topic == topics.miniserver_startup_topic {
-                if pyget!(self.global_config, py, "miniserver", "sync_with_miniserver").extract::<bool>()? {
-                    info!("Miniserver startup detected, resyncing whitelist (from Rust)");
-                    let _ = self.relay_main_obj.bind(py).call_method0("schedule_miniserver_sync")?;
-                }
-            }
-            else if topic == topics.start_ui_topic {
-                let coro = self.relay_main_obj.bind(py).call_method0("start_ui")?;
-                let fut = into_future(coro.clone())?;
-                pyo3_async_runtimes::tokio::get_runtime().spawn(async move {
-                    if let Err(e) = fut.await {
-                        error!("Error in start_ui async call: {:?}", e);
-                    }
-                });
-            }
-            else if topic == topics.stop_ui_topic {
-                let coro = self.relay_main_obj.bind(py).call_method0("stop_ui")?;
-                let fut = into_future(coro.clone())?;
-                pyo3_async_runtimes::tokio::get_runtime().spawn(async move {
-                    if let Err(e) = fut.await {
-                        error!("Error in stop_ui async call: {:?}", e);
+            // Match the topic to whichever action it needs, one hash lookup for all control topics
+            match self.control_topics.get(topic.as_str()).copied() {
+                Some(ControlAction::MiniserverStartup) => {
+                    if pyget!(self.global_config, py, "miniserver", "sync_with_miniserver").extract::<bool>()? {
+                        info!("Miniserver startup detected, resyncing whitelist (from Rust)");
+                        let _ = self.relay_main_obj.bind(py).call_method0("schedule_miniserver_sync")?;
                     }
-                });
-            }
-       
-            else if topic == topics.config_get_topic {
-                // global_config.get_safe_config -> orjson.dumps -> publish
-                let global_config_py = self
-                    .relay_main_obj
-                    .bind(py)
-                    .getattr(intern!(py, "miniserver_data_processor"))?
-                    .getattr(intern!(py, "global_config"))?;
-                let safe_cfg = global_config_py.call_method0("get_safe_config")?;
-                let serialized = self.orjson_obj.bind(py).call_method1("dumps", (safe_cfg,))?;
-                let coro = self
-                    .mqtt_client_obj
-                    .bind(py)
-                    .call_method1("publish", (topics.config_response_topic.clone(), serialized))?;
-                let fut = into_future(coro.clone())?;
-                pyo3_async_runtimes::tokio::get_runtime().spawn(async move {
-                    if let Err(e) = fut.await {
-                        error!("Error publishing config response: {:?}", e);
-                    }
-                });
-            }
-            else if topic == topics.config_set_topic || topic == topics.config_add_topic || topic == topics.config_remove_topic {
-                let update_mode = if topic == topics.config_set_topic {
-                    "set"
-                } else if topic == topics.config_add_topic {
-                    "add"
-                } else {
-                    "remove"
-                };
-                let load_res = self.orjson_obj.bind(py).call_method1("loads", (message.as_str(),));
-                match load_res {
-                    Ok(py_obj) => {
-                        let global_config_py = self
-                            .relay_main_obj
-                            .bind(py)
-                            .getattr(intern!(py, "miniserver_data_processor"))?
-                            .getattr(intern!(py, "global_config"))?;
-                        let update_res = global_config_py.call_method1("update_fields", (py_obj, update_mode));
-                        if let Err(e) = update_res {
-                            error!("Error updating configuration: {:?}", e);
-                        } else {
-                            info!("Configuration updated via MQTT. Restarting program (from Rust).");
-                            let _ = self.relay_main_obj.bind(py).call_method0("restart_relay_incl_ui");
+                }
+                Some(ControlAction::StartUi) => {
+                    let coro = self.relay_main_obj.bind(py).call_method0("start_ui")?;
+                    let fut = into_future(coro.clone())?;
+                    pyo3_async_runtimes::tokio::get_runtime().spawn(async move {
+                        if let Err(e) = fut.await {
+                            error!("Error in start_ui async call: {:?}", e);
+                        }
+                    });
+                }
+                Some(ControlAction::StopUi) => {
+                    let coro = self.relay_main_obj.bind(py).call_method0("stop_ui")?;
+                    let fut = into_future(coro.clone())?;
+                    pyo3_async_runtimes::tokio::get_runtime().spawn(async move {
+                        if let Err(e) = fut.await {
+                            error!("Error in stop_ui async call: {:?}", e);
+                        }
+                    });
+                }
+                Some(ControlAction::ConfigGet) => {
+                    // global_config.get_safe_config -> orjson.dumps -> publish
+                    let global_config_py = self
+                        .relay_main_obj
+                        .bind(py)
+                        .getattr(intern!(py, "miniserver_data_processor"))?
+                        .getattr(intern!(py, "global_config"))?;
+                    let safe_cfg = global_config_py.call_method0("get_safe_config")?;
+                    let serialized = self.orjson_obj.bind(py).call_method1("dumps", (safe_cfg,))?;
+                    let coro = self
+                        .mqtt_client_obj
+                        .bind(py)
+                        .call_method1("publish", (self.config_response_topic.clone(), serialized))?;
+                    let fut = into_future(coro.clone())?;
+                    pyo3_async_runtimes::tokio::get_runtime().spawn(async move {
+                        if let Err(e) = fut.await {
+                            error!("Error publishing config response: {:?}", e);
+                        }
+                    });
+                }
+                Some(ControlAction::ConfigUpdate(update_mode)) => {
+                    let load_res = self.orjson_obj.bind(py).call_method1("loads", (message.as_str(),));
+                    match load_res {
+                        Ok(py_obj) => {
+                            let global_config_py = self
+                                .relay_main_obj
+                                .bind(py)
+                                .getattr(intern!(py, "miniserver_data_processor"))?
+                                .getattr(intern!(py, "global_config"))?;
+                            let update_res = global_config_py.call_method1("update_fields", (py_obj, update_mode));
+                            if let Err(e) = update_res {
+                                error!("Error updating configuration: {:?}", e);
+                            } else {
+                                // Cached flags follow the update right away, not only after the restart
+                                if let Err(e) = self.reload_config(py) {
+                                    error!("Error reloading processing config: {:?}", e);
+                                }
+                                info!("Configuration updated via MQTT. Restarting program (from Rust).");
+                                let _ = self.relay_main_obj.bind(py).call_method0("restart_relay_incl_ui");
+                            }
+                        },
+                        Err(e) => {
+                            error!("Invalid JSON format in MQTT message: {:?}", e);
                         }
-                    },
-                    Err(e) => {
-                        error!("Invalid JSON format in MQTT message: {:?}", e);
                     }
                 }
-            }
-            else if topic == topics.config_update_topic || topic == topics.config_restart_topic {
-                info!("Reloading configuration. Restarting program (from Rust).");
-                let _ = self.relay_main_obj.bind(py).call_method0("restart_relay_incl_ui");
+                Some(ControlAction::Restart) => {
+                    info!("Reloading configuration. Restarting program (from Rust).");
+                    let _ = self.relay_main_obj.bind(py).call_method0("restart_relay_incl_ui");
+                }
+                None => {}
             }
         }
         else {
@@ -555,46 +609,30 @@ impl MiniserverDataProcessor {
 
     #[pyo3(text_signature = "(self)")]
     fn get_do_not_forward_patterns(&self) -> Vec<String> {
-        if let Some(ref regex) = self.do_not_forward_patterns {
-            // Convert the regex pattern back to individual patterns by:
-            // 1. Remove the outer parentheses
-            // 2. Split on the '|' character
-            let pattern = regex.as_str();
-            if pattern.starts_with('(') && pattern.ends_with(')') {
-                pattern[1..pattern.len()-1]
-                    .split('|')
-                    .map(String::from)
-                    .collect()
-            } else {
-                vec![pattern.to_string()]
-            }
-        } else {
-            Vec::new()
-        }
+        self.do_not_forward_filters.clone()
     }
 
     #[pyo3(text_signature = "(self)")]
     fn get_subscription_filters(&self) -> Vec<String> {
-        if let Some(ref regex) = self.compiled_subscription_filter {
-            // Convert the regex pattern back to individual patterns by:
-            // 1. Remove the outer parentheses
-            // 2. Split on the '|' character
-            let pattern = regex.as_str();
-            if pattern.starts_with('(') && pattern.ends_with(')') {
-                pattern[1..pattern.len()-1]
-                    .split('|')
-                    .map(String::from)
-                    .collect()
-            } else {
-                vec![pattern.to_string()]
-            }
-        } else {
-            Vec::new()
-        }
+        self.subscription_filters.clone()
     }
 
 }
 
+impl MiniserverDataProcessor {
+    /// Recompile both filter passes from the stored filter lists.
+    fn rebuild_filters(&mut self) {
+        self.compiled_subscription_filter = compile_filters(&self.subscription_filters);
+        let reject_filters: Vec<String> = self
+            .subscription_filters
+            .iter()
+            .chain(self.do_not_forward_filters.iter())
+            .cloned()
+            .collect();
+        self.compiled_reject_filter = compile_filters(&reject_filters);
+    }
+}
+
 /// Initialize the Rust logger
 #[pyfunction]
 fn init_rust_logger() {
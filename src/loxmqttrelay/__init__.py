@@ -5,49 +5,21 @@ This package provides a bridge between MQTT and Loxone Miniserver, allowing bidi
 communication between MQTT topics and Loxone controls.
 """
 __version__ = "0.1.0"
-import platform
-import subprocess
+import importlib
 
-from loxmqttrelay.logging_config import get_lazy_logger
+# Rust symbols are resolved on first access (PEP 562), so importing the package
+# does not load the extension until they are actually needed. CPU specific code
+# paths are selected inside the extension at runtime (see multiversion! in src/lib.rs)
+_LAZY_BACKEND_SYMBOLS = ("MiniserverDataProcessor", "init_rust_logger")
 
-logger = get_lazy_logger(__name__)
 
-# Determine which implementation to use based on CPU architecture and features
-if "arm" in platform.machine().lower():
-    from loxmqttrelay.compatible._loxmqttrelay import (
-        MiniserverDataProcessor,
-        init_rust_logger
-    )
-    logger.info("Using ARM compatible implementation")
-else:
-    system = platform.system()
-    try:
-        if system == "Linux":
-            output = subprocess.check_output("lscpu", shell=True, text=True)
-        elif system == "Darwin":  # macOS
-            output = subprocess.check_output("sysctl -a | grep machdep.cpu", shell=True, text=True)
-        elif system == "Windows":
-            output = subprocess.check_output("wmic cpu get Caption", shell=True, text=True)
-            
-        if output and ("avx" in output.lower() and "avx2" in output.lower()):
-            from loxmqttrelay.optimized._loxmqttrelay import (
-                MiniserverDataProcessor,
-                init_rust_logger
-            )
-            logger.info("Using optimized implementation with AVX/AVX2 support")
-        else:
-            from loxmqttrelay.compatible._loxmqttrelay import (
-                MiniserverDataProcessor,
-                init_rust_logger
-            )
-            logger.info("Using compatible implementation (AVX/AVX2 not detected)")
-
-    except subprocess.CalledProcessError:
-        logger.error("Error checking CPU features. Using compatible implementation.")
-        from loxmqttrelay.compatible._loxmqttrelay import (
-            MiniserverDataProcessor,
-            init_rust_logger
-        )
+def __getattr__(name: str):
+    if name in _LAZY_BACKEND_SYMBOLS:
+        backend = importlib.import_module("loxmqttrelay._loxmqttrelay")
+        for symbol in _LAZY_BACKEND_SYMBOLS:
+            globals()[symbol] = getattr(backend, symbol)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 from loxmqttrelay.config import global_config
 from .utils import setup_logging
@@ -61,4 +33,4 @@ __all__ = [
     'global_config',
     'MiniserverDataProcessor',
     'init_rust_logger'
-]
\ No newline at end of file
+]
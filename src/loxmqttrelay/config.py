@@ -1,9 +1,11 @@
 import os
+import hashlib
 import logging
-from dataclasses import dataclass, field, asdict, replace, fields
-import threading
+from dataclasses import dataclass, field, replace, fields
+import functools
 from typing import Dict, Any, List, Optional, Literal, get_type_hints, Set
-import tomlkit
+import tomllib
+import tomli_w
 from enum import Enum
 
 # Use standard logging here to avoid circular imports
@@ -19,13 +21,13 @@ class ConfigSection(Enum):
     UDP = "udp"
     DEBUG = "debug"
 
-@dataclass
+@dataclass(slots=True)
 class GeneralConfig:
     log_level: str = "INFO"
     base_topic: str = "myrelay/"
     cache_size: int = 100000
 
-@dataclass
+@dataclass(slots=True)
 class BrokerConfig:
     host: str = "localhost"
     port: int = 1883
@@ -33,38 +35,43 @@ class BrokerConfig:
     password: Optional[str] = None
     client_id: str = "loxmqttrelay"
 
-@dataclass
+@dataclass(slots=True)
 class MiniserverConfig:
     miniserver_ip: str = "127.0.0.1"
     miniserver_port: int = 80
     miniserver_user: str = ""
     miniserver_pass: str = ""
     miniserver_max_parallel_connections: int = 5
+    # Verify the TLS certificate on port 443, off by default since a Miniserver reached by IP
+    # usually presents a certificate that fails the hostname or CA check
+    miniserver_verify_ssl: bool = False
     sync_with_miniserver: bool = True
     use_websocket: bool = True
 
-@dataclass
+@dataclass(slots=True)
 class TopicsConfig:
     subscriptions: List[str] = field(default_factory=list)
     subscription_filters: List[str] = field(default_factory=list)
     topic_whitelist: Set[str] = field(default_factory=set)
     do_not_forward: List[str] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class ProcessingConfig:
     expand_json: bool = True
     convert_booleans: bool = True
 
-@dataclass
+@dataclass(slots=True)
 class UdpConfig:
     udp_in_port: int = 11884
 
-@dataclass
+@dataclass(slots=True)
 class DebugConfig:
     mock_ip: str = ""
     enable_mock: bool = False
+    # With the mock enabled, acknowledge sends without any network I/O
+    mock_shortcircuit: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class AppConfig:
     general: GeneralConfig = field(default_factory=GeneralConfig)
     broker: BrokerConfig = field(default_factory=BrokerConfig)
@@ -75,7 +82,12 @@ class AppConfig:
     debug: DebugConfig = field(default_factory=DebugConfig)
 
     def to_dict(self) -> Dict[str, Any]:
-        return {f.name: asdict(getattr(self, f.name)) for f in fields(self)}
+        # Sections are flat, so copying the containers is equivalent to asdict()
+        # without its recursive deepcopy walk over every field
+        return {
+            name: {key: _copy_field(getattr(getattr(self, name), key)) for key in field_names}
+            for name, field_names in _SECTION_FIELDS.items()
+        }
 
     @classmethod
     def from_dict(cls, config_dict: Dict[str, Any]) -> "AppConfig":
@@ -83,11 +95,11 @@ class AppConfig:
 
     @staticmethod
     def _create_section(section: str, config_dict: Dict[str, Any]) -> Any:
-        section_class = globals().get(section.capitalize() + "Config")
+        section_class = _SECTION_CLASSES.get(section)
         if section_class is None:
             raise ConfigError(f"Invalid configuration section: {section}")
         data = config_dict.get(section, {})
-        valid_fields = get_type_hints(section_class)
+        valid_fields = _SECTION_FIELDS[section]
         valid_data = {}
         for key, value in data.items():
             if key in valid_fields:
@@ -101,41 +113,65 @@ class AppConfig:
 class ConfigError(Exception):
     pass
 
-class Config:
-    _instance = None
-    _lock = threading.Lock()
-
-    def __new__(cls):
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = super().__new__(cls)
-        return cls._instance
+def _copy_field(value: Any) -> Any:
+    return value.copy() if isinstance(value, (list, set, dict)) else value
+
+# Section metadata, resolved once at import instead of per lookup via globals()/get_type_hints
+_SECTION_CLASSES: Dict[str, type] = {
+    section.value: globals()[section.value.capitalize() + "Config"] for section in ConfigSection
+}
+_SECTION_FIELDS: Dict[str, Dict[str, type]] = {
+    name: get_type_hints(section_class) for name, section_class in _SECTION_CLASSES.items()
+}
+_FIELD_MAPPINGS: Dict[str, tuple[ConfigSection, type]] = {
+    field_name: (section, field_type)
+    for section in ConfigSection
+    for field_name, field_type in _SECTION_FIELDS[section.value].items()
+}
+
+def _merge_values(current: Any, value: Any, list_mode: Literal["set", "add", "remove"]) -> Any:
+    """Merge value into a list/set field according to list_mode, keeping the container type of current."""
+    items = value if isinstance(value, (list, set, frozenset, tuple)) else (value,)
+    if isinstance(current, set):
+        if list_mode == "set":
+            return set(items)
+        if list_mode == "add":
+            return current.union(items)
+        if list_mode == "remove":
+            return current.difference(items)
+    else:
+        if list_mode == "set":
+            return list(items)
+        if list_mode == "add":
+            # Preserve order, drop duplicates
+            return list(dict.fromkeys([*current, *items]))
+        if list_mode == "remove":
+            removed = set(items)
+            return [item for item in current if item not in removed]
+    raise ValueError(f"Invalid list_mode: {list_mode}")
 
+class Config:
     def __init__(self, config_path: str = "config/config.toml"):
-        with self._lock:
-            if not hasattr(self, '_initialized'):
-                self.config_path = config_path
-                self._config = self._load_config()
-                self.field_mappings = self._map_fields_to_sections()
-                self._initialized = True
+        self.config_path = config_path
+        self._last_written_hash: Optional[str] = None
+        self._config = self._load_config()
+        self.field_mappings = self._map_fields_to_sections()
 
     def _load_config(self) -> AppConfig:
         if not os.path.exists(self.config_path):
             logger.warning(f"Config file not found, creating default config: {self.config_path}")
             return AppConfig()
 
-        with open(self.config_path, "r") as f:
-            config_dict = tomlkit.parse(f.read()).unwrap()
+        with open(self.config_path, "rb") as f:
+            config_dict = tomllib.load(f)
         return AppConfig.from_dict(config_dict)
 
     def save_config(self) -> None:
-        doc = tomlkit.document()
         config_dict = self._config.to_dict()
         
         # Convert None values to empty strings before saving
+        cleaned_config = {}
         for section, values in config_dict.items():
-            table = tomlkit.table()
             cleaned_values = {}
             for key, value in values.items():
                 if value is None:
@@ -143,81 +179,79 @@ class Config:
                 elif isinstance(value, dict):
                     # Handle nested dictionaries
                     cleaned_values[key] = {k: "" if v is None else v for k, v in value.items()}
-                elif isinstance(value, list):
-                    # Handle lists - ensure no None values in lists
-                    cleaned_values[key] = [item if item is not None else "" for item in value]
+                elif isinstance(value, (list, set, frozenset)):
+                    # Handle lists/sets - TOML only knows arrays, ensure no None values in them
+                    items = sorted(value) if isinstance(value, (set, frozenset)) else value
+                    cleaned_values[key] = [item if item is not None else "" for item in items]
                 else:
                     cleaned_values[key] = value
-            
-            # Add each key-value pair to the table individually
-            for key, value in cleaned_values.items():
-                table.add(key, value)
-            
-            doc.add(section, table)
+            cleaned_config[section] = cleaned_values
+        data = tomli_w.dumps(cleaned_config).encode("utf-8")
+
+        # Skip the write if this exact content was already written to this path
+        digest = hashlib.sha1(self.config_path.encode("utf-8") + b"\0" + data).hexdigest()
+        if digest == self._last_written_hash:
+            logger.debug("Config unchanged, skipping write")
+            return
         try:    
-            with open(self.config_path, "w") as f:
-                f.write(tomlkit.dumps(doc))
+            self._write_atomic(data)
+            self._last_written_hash = digest
         except PermissionError as e:
             logger.error(f"⚠️ No write permission for {self.config_path} for user {os.getlogin()} with uid {os.getuid()} and gid {os.getgid()}. File Owner: {os.stat(self.config_path).st_uid}, Group: {os.stat(self.config_path).st_gid}")
             logger.error("Trying to change ownership...")
             try:
                 os.chmod(self.config_path, 0o666)
-                with open(self.config_path, "w") as f:
-                    f.write(tomlkit.dumps(doc))
+                # The directory may not be writable for a temp file, fall back to an in-place write
+                with open(self.config_path, "wb") as f:
+                    f.write(data)
+                self._last_written_hash = digest
             except PermissionError as e:
                 logger.error(f"⚠️ Still no write permission for {self.config_path} for user {os.getlogin()} with uid {os.getuid()} and gid {os.getgid()}. File Owner: {os.stat(self.config_path).st_uid}, Group: {os.stat(self.config_path).st_gid}")
                 logger.error("Please change the file permissions and restart.")
         except Exception as e:
             logger.error(f"Error saving config: {e}")
 
-    def update_field(self, field_name: str, value: Any, list_mode: Literal["set", "add", "remove"] = "set") -> None:
+    def _write_atomic(self, data: bytes) -> None:
+        """Write to a temp file next to the config and swap it in, so a crash never leaves a truncated config."""
+        tmp_path = self.config_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def update_field(self, field_name: str, value: Any, list_mode: Literal["set", "add", "remove"] = "set", defer_save: bool = False) -> None:
+        self._apply_field(field_name, value, list_mode)
+        if not defer_save:
+            self.save_config()
+
+    def _apply_field(self, field_name: str, value: Any, list_mode: Literal["set", "add", "remove"] = "set") -> None:
+        """Apply a field update in memory only; callers are responsible for persisting it."""
         section, field_type = self._get_field_info(field_name)
         current_value = getattr(getattr(self._config, section.value), field_name)
 
         if isinstance(current_value, (list, set)):
-            if isinstance(current_value, set):
-                if list_mode == "set":
-                    new_value = set(value) if isinstance(value, (list, set)) else {value}
-                elif list_mode == "add":
-                    new_value = current_value | (set(value) if isinstance(value, (list, set)) else {value})
-                elif list_mode == "remove":
-                    new_value = current_value - (set(value) if isinstance(value, (list, set)) else {value})
-            else:  # list type
-                if list_mode == "set":
-                    new_value = list(value) if isinstance(value, list) else [value]
-                elif list_mode == "add":
-                    new_value = list(set(current_value + (value if isinstance(value, list) else [value])))
-                elif list_mode == "remove":
-                    new_value = [item for item in current_value if item not in (value if isinstance(value, list) else [value])]
-            value = new_value
+            value = _merge_values(current_value, value, list_mode)
 
         setattr(getattr(self._config, section.value), field_name, value)
-        self.save_config()
 
     def update_fields(self, updates: Dict[str, Any], list_mode: Literal["set", "add", "remove"] = "set") -> None:
         for field_name, value in updates.items():
-            self.update_field(field_name, value, list_mode)
+            self._apply_field(field_name, value, list_mode)
+        # Serialize once for the whole batch instead of once per field
+        self.save_config()
 
     def update_config(self, section: ConfigSection, updates: Dict[str, Any], list_mode: Literal["set", "add", "remove"] = "set") -> None:
         section_config = getattr(self._config, section.value)
         for field_name, value in updates.items():
             current_value = getattr(section_config, field_name)
             if isinstance(current_value, (list, set)):
-                if isinstance(current_value, set):
-                    if list_mode == "set":
-                        new_value = set(value) if isinstance(value, (list, set)) else {value}
-                    elif list_mode == "add":
-                        new_value = current_value | (set(value) if isinstance(value, (list, set)) else {value})
-                    elif list_mode == "remove":
-                        new_value = current_value - (set(value) if isinstance(value, (list, set)) else {value})
-                else:  # list type
-                    if list_mode == "set":
-                        new_value = list(value) if isinstance(value, list) else [value]
-                    elif list_mode == "add":
-                        new_value = list(set(current_value + (value if isinstance(value, list) else [value])))
-                    elif list_mode == "remove":
-                        new_value = [item for item in current_value if item not in (value if isinstance(value, list) else [value])]
-                updates[field_name] = new_value
+                updates[field_name] = _merge_values(current_value, value, list_mode)
         setattr(self._config, section.value, replace(section_config, **updates))
         self.save_config()
 
@@ -228,12 +262,7 @@ class Config:
 
     @staticmethod
     def _map_fields_to_sections() -> Dict[str, tuple[ConfigSection, type]]:
-        mappings = {}
-        for section in ConfigSection:
-            config_class = globals()[section.value.capitalize() + "Config"]
-            for field_name, field_type in get_type_hints(config_class).items():
-                mappings[field_name] = (section, field_type)
-        return mappings
+        return _FIELD_MAPPINGS
 
     def shutdown(self):
         self.save_config()
@@ -286,4 +315,9 @@ class Config:
             
         return config_dict
 
-global_config = Config()
+@functools.cache
+def get_config(config_path: str = "config/config.toml") -> Config:
+    """Return the shared Config for config_path, loading it on first use."""
+    return Config(config_path)
+
+global_config = get_config()
@@ -1,67 +1,372 @@
 import asyncio
+import contextlib
+import math
+import random
+import time
 import aiohttp
-from typing import Any 
-from loxmqttrelay.config import global_config
+import orjson
+from dataclasses import dataclass
+from typing import Any, List, Optional, Set, Tuple
+from loxmqttrelay.config import Config, global_config
 from loxmqttrelay.logging_config import get_lazy_logger
 from loxwebsocket.lox_ws_api import loxwebsocket
 
 logger = get_lazy_logger(__name__)
 
+try:
+    import aiodns  # noqa: F401 - only needed for aiohttp's AsyncResolver
+    _RESOLVER_CLASS = aiohttp.AsyncResolver
+except ImportError:
+    _RESOLVER_CLASS = aiohttp.ThreadedResolver
+
+# Status code and description per failure type of an HTTP send, looked up along the
+# exception's MRO so the most specific entry wins (ClientOSError is both a ClientError and an OSError)
+_ERR_MAP = {
+    aiohttp.ServerTimeoutError: (408, "Timeout"),
+    asyncio.TimeoutError: (408, "Timeout"),
+    asyncio.CancelledError: (499, "Cancelled"),
+    aiohttp.ClientOSError: (503, "Connection error"),
+    OSError: (503, "Connection error"),
+    aiohttp.ClientError: (500, "Client error"),
+}
+_ERR_DEFAULT = (500, "Unexpected error")
+
+
+def _lookup_error(exc: BaseException) -> Tuple[int, str]:
+    for cls in type(exc).__mro__:
+        entry = _ERR_MAP.get(cls)
+        if entry is not None:
+            return entry
+    return _ERR_DEFAULT
+
 # Initialize global instances with default values
 
 
+class AdaptiveLimiter:
+    """
+    Vegas-style adaptive concurrency limit.
+
+    The limit grows while request latency stays close to the best observed latency and
+    shrinks when requests queue up at the Miniserver (latency rises) or fail. It never
+    exceeds max_limit, which is the configured number of parallel connections.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, alpha: int = 2, beta: int = 4):
+        self.max_limit = max(max_limit, min_limit)
+        self.min_limit = min_limit
+        self.limit = self.max_limit
+        self.alpha = alpha
+        self.beta = beta
+        self._in_flight = 0
+        self._rtt_min = math.inf
+        self._cond = asyncio.Condition()
+
+    @contextlib.asynccontextmanager
+    async def use(self):
+        """Hold one slot for the duration of a request. Yields a sample; call sample.drop() on failure."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+        sample = _LimiterSample()
+        start = time.monotonic()
+        cancelled = False
+        try:
+            yield sample
+        except asyncio.CancelledError:
+            # A cancelled request says nothing about the Miniserver, its RTT is not sampled
+            cancelled = True
+            raise
+        except BaseException:
+            sample.drop()
+            raise
+        finally:
+            if not cancelled:
+                self._update(time.monotonic() - start, sample.dropped)
+            async with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def _update(self, rtt: float, dropped: bool) -> None:
+        if dropped:
+            self.limit = max(self.min_limit, self.limit // 2)
+            return
+        self._rtt_min = min(self._rtt_min, rtt)
+        # Estimated number of requests queued at the Miniserver
+        queue_size = self.limit * (1 - self._rtt_min / rtt) if rtt > 0 else 0
+        if queue_size < self.alpha:
+            self.limit = min(self.max_limit, self.limit + 1)
+        elif queue_size > self.beta:
+            self.limit = max(self.min_limit, self.limit - 1)
+
+
+class _LimiterSample:
+    __slots__ = ("dropped",)
+
+    def __init__(self):
+        self.dropped = False
+
+    def drop(self) -> None:
+        self.dropped = True
+
+
+@dataclass(slots=True, frozen=True)
+class _MSConfig:
+    """Miniserver connection settings, read from the config once. Changing them requires a restart."""
+    ip: str
+    port: int
+    user: str
+    password: str
+    enable_mock: bool
+    mock_ip: str
+    mock_shortcircuit: bool
+    max_parallel_connections: int
+    verify_ssl: bool = False
+
+    @classmethod
+    def from_config(cls, config: Config) -> "_MSConfig":
+        return cls(
+            ip=config.miniserver.miniserver_ip,
+            port=config.miniserver.miniserver_port,
+            user=config.miniserver.miniserver_user,
+            password=config.miniserver.miniserver_pass,
+            enable_mock=config.debug.enable_mock,
+            mock_ip=config.debug.mock_ip,
+            mock_shortcircuit=config.debug.mock_shortcircuit,
+            max_parallel_connections=config.miniserver.miniserver_max_parallel_connections,
+            verify_ssl=config.miniserver.miniserver_verify_ssl,
+        )
+
+    @property
+    def use_mock(self) -> bool:
+        # Use mock miniserver IP only if both provided and enabled
+        return bool(self.mock_ip and self.enable_mock)
+
+    @property
+    def skip_network(self) -> bool:
+        # Short-circuit only applies in mock mode, a real Miniserver always gets the message
+        return self.enable_mock and self.mock_shortcircuit
+
+    @property
+    def target_ip(self) -> str:
+        return self.mock_ip if self.use_mock else self.ip
+
+    @property
+    def base_url(self) -> str:
+        # Construct WebSocket and HTTP URLs with proper port handling
+        protocol = "https" if self.port == 443 else "http"
+        if self.port not in [80, 443]:
+            return f"{protocol}://{self.target_ip}:{self.port}"
+        return f"{protocol}://{self.target_ip}"
+
+
 class HttpMiniserverHandler:
 
-    ms_ip = global_config.miniserver.miniserver_ip
-    ms_port = global_config.miniserver.miniserver_port
-    ms_user = global_config.miniserver.miniserver_user
-    ms_pass = global_config.miniserver.miniserver_pass
-    enable_mock_miniserver=global_config.debug.enable_mock
-    mock_ms_ip=global_config.debug.mock_ip
-    connection_semaphore = asyncio.Semaphore(global_config.miniserver.miniserver_max_parallel_connections)  # Default to 5 parallel connections
-    target_ip = mock_ms_ip if (mock_ms_ip and enable_mock_miniserver) else ms_ip
-    # Construct WebSocket URL with proper port handling
-    protocol = "https" if ms_port == 443 else "http"
-    if ms_port not in [80, 443]:
-        ws_base_url = f"{protocol}://{target_ip}:{ms_port}"
-        http_base_url = f"http://{target_ip}:{ms_port}"
-    else:
-        ws_base_url = f"{protocol}://{target_ip}"
-        http_base_url = f"http://{target_ip}"
-    auth = aiohttp.BasicAuth(ms_user, ms_pass) if ms_user and ms_pass else None
     # Increase the timeout to 10 seconds
     timeout = aiohttp.ClientTimeout(total=10)
+    # Keep-alive for idle Miniserver connections in the shared session (seconds)
+    keepalive_timeout = 30
+    # The Miniserver address does not change at runtime, cache its DNS entry (seconds)
+    ttl_dns_cache = 300
+    _session: Optional[aiohttp.ClientSession] = None
+    # Sends arriving within this window (seconds) are coalesced into one batch
+    batch_window = 0.005
+    # Messages waiting for the next batch, further sends are dropped when full
+    queue_size = 10000
+    _queue: Optional[asyncio.Queue] = None
+    _drain_task: Optional[asyncio.Task] = None
+    # WebSocket reconnect backoff: base * 2^attempt seconds, capped, plus up to 20% jitter
+    reconnect_base_delay = 0.1
+    reconnect_max_delay = 30.0
+    # Give up reconnecting after this many seconds, the send is then answered with 503
+    reconnect_give_up_after = 30.0
+    # close() waits this long (seconds) for in-flight batches before cancelling them
+    close_timeout = 5.0
 
 
     """Handler for processing and sending data to Miniserver via HTTP."""
-    def __init__(self):
+    def __init__(self, settings: Optional[_MSConfig] = None):
+        self._apply_settings(settings or _MSConfig.from_config(global_config))
+        self.limiter = AdaptiveLimiter(self.max_parallel_connections)
+        # Per instance, a class-level set would be shared by every handler
+        self._batch_tasks: Set[asyncio.Task] = set()
+        self._reconnect_attempts = 0
+        self._last_give_up = -math.inf
+        self._connect_lock = asyncio.Lock()
         logger.info("MQTT Miniserver Handler created")
 
+    def _apply_settings(self, settings: _MSConfig) -> None:
+        # Everything derived from the settings is resolved once here, not per send
+        self.settings = settings
+        self.max_parallel_connections = settings.max_parallel_connections
+        self.target_ip = settings.target_ip
+        self.target_label = "(mock)" if settings.use_mock else "(real)"
+        self.skip_network = settings.skip_network
+        self.ws_base_url = settings.base_url
+        self.http_base_url = self.ws_base_url
+        # Pre-built prefix for virtual input URLs, only topic and value are appended per send
+        self.http_url_prefix = f"{self.http_base_url}/dev/sps/io/"
+        self.auth = aiohttp.BasicAuth(settings.user, settings.password) if settings.user and settings.password else None
+        # Only matters for https (port 443), False skips the certificate check
+        self.verify_ssl = settings.verify_ssl
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the shared HTTP session, creating it on first use.
+        Reusing one session keeps the keep-alive connections to the Miniserver open across sends.
+        """
+        if self._session is None or self._session.closed:
+            # The connector limits concurrent requests to the Miniserver, no extra semaphore needed
+            connector = aiohttp.TCPConnector(
+                limit=self.max_parallel_connections,
+                limit_per_host=self.max_parallel_connections,
+                keepalive_timeout=self.keepalive_timeout,
+                resolver=_RESOLVER_CLASS(),
+                use_dns_cache=True,
+                ttl_dns_cache=self.ttl_dns_cache,
+                ssl=self.verify_ssl
+            )
+            self._session = aiohttp.ClientSession(auth=self.auth, timeout=self.timeout, connector=connector)
+        return self._session
+
+    def start_batching(self) -> None:
+        """
+        Start coalescing sends into micro-batches. Must be called from within the running event loop.
+        Until this is called, send_to_miniserver sends every message immediately.
+        """
+        if self._drain_task is None or self._drain_task.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._drain_task = asyncio.create_task(self._drain_loop(self._queue))
+
+    async def _drain_loop(self, queue: asyncio.Queue) -> None:
+        while True:
+            items = [await queue.get()]
+            try:
+                await asyncio.sleep(self.batch_window)
+            finally:
+                # Also runs on cancellation, so messages already taken from the queue are not lost
+                while not queue.empty():
+                    items.append(queue.get_nowait())
+                self._spawn_batch(items)
+
+    def _spawn_batch(self, items: List[Tuple[str, str, Any]]) -> None:
+        # Fire the batch without blocking the next one, the connector still caps concurrency.
+        # The task is referenced until done, the event loop itself only keeps a weak reference.
+        task = asyncio.create_task(self.send_batch_to_miniserver(items))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def send_batch_to_miniserver(self, items: List[Tuple[str, str, Any]]) -> List[Tuple[str, int]]:
+        """
+        Send a list of (topic, normalized_topic, value) to the Miniserver concurrently.
+        Returns (topic, status code) per item in input order.
+        """
+        logger.debug("Sending batch of %d messages to Miniserver", len(items))
+        codes = await asyncio.gather(
+            *(self._send(topic, normalized_topic, value) for topic, normalized_topic, value in items),
+            return_exceptions=True
+        )
+        return [
+            (item[0], code if not isinstance(code, BaseException) else _lookup_error(code)[0])
+            for item, code in zip(items, codes)
+        ]
+
+    async def close(self) -> None:
+        """Stop batching, wait for pending sends and close the shared HTTP session."""
+        if self._drain_task is not None:
+            drain_task, queue = self._drain_task, self._queue
+            self._drain_task = None
+            self._queue = None
+            drain_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await drain_task
+            # Flush messages that were queued but not picked up by the drain loop
+            if queue is not None and not queue.empty():
+                self._spawn_batch([queue.get_nowait() for _ in range(queue.qsize())])
+        if self._batch_tasks:
+            # Bounded wait, a batch stuck on an unreachable Miniserver must not hang shutdown
+            _, pending = await asyncio.wait(set(self._batch_tasks), timeout=self.close_timeout)
+            if pending:
+                logger.warning("Cancelling %d Miniserver batches still pending on close", len(pending))
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     async def send_to_minisever_via_websocket(
         self,
         topic: str,
         normalized_topic: str,
         value: Any
-    ) -> None:
+    ) -> int:
         """
         Sends data to the Loxone Miniserver via a WebSocket connection.
-        Returns a dictionary with results for each topic.
+        Returns 200 on success, 503 if the Miniserver could not be reached and 500 if the command could not be sent.
         """
         # Determine target IP
-        logger.debug(f"Using miniserver address: {self.target_ip} {'(mock)' if (self.mock_ms_ip and self.enable_mock_miniserver) else '(real)'}")
+        logger.debug("Using miniserver address: %s %s", self.target_ip, self.target_label)
 
         ws_client = loxwebsocket
-        if "CONNECTED" not in ws_client.state:
-            await ws_client.connect(user=self.ms_user, password=self.ms_pass, loxone_url=self.ws_base_url, receive_updates=False)
+        if not await self._ensure_connected():
+            return 503
+        # Structured values are sent as JSON, everything else as its string form
+        payload = orjson.dumps(value).decode() if isinstance(value, (dict, list)) else str(value)
 
-        try:
-            await ws_client.send_websocket_command(normalized_topic, str(value))
-            logger.debug(f"Sent {topic} (as {normalized_topic})={value} to Miniserver successfully via WebSocket.")
-            return 
-        except Exception as e:
-            error_msg = f"Error sending {topic} (as {normalized_topic})={value} to Miniserver via WebSocket: {str(e)}"
-            logger.error(error_msg)
-            return 
+        for attempt in range(2):
+            try:
+                await ws_client.send_websocket_command(normalized_topic, payload)
+                logger.debug("Sent %s (as %s)=%s to Miniserver successfully via WebSocket.", topic, normalized_topic, value)
+                return 200
+            except Exception as e:
+                if attempt == 0:
+                    # The socket may have dropped since the state check, reconnect and retry once
+                    logger.warning(f"Sending {topic} via WebSocket failed ({str(e)}), reconnecting and retrying")
+                    if not await self._ensure_connected():
+                        return 503
+                    continue
+                error_msg = f"Error sending {topic} (as {normalized_topic})={value} to Miniserver via WebSocket: {str(e)}"
+                logger.error(error_msg)
+                return 500
+        return 500
+
+    async def _ensure_connected(self) -> bool:
+        """
+        Connect the WebSocket client if needed, retrying with capped exponential backoff and jitter.
+        Returns False if still not connected after reconnect_give_up_after seconds.
+        """
+        ws_client = loxwebsocket
+        if "CONNECTED" in ws_client.state:
+            return True
+        queued_at = time.monotonic()
+        async with self._connect_lock:
+            # Senders queued behind the lock reuse the outcome of the attempt that held it
+            if "CONNECTED" in ws_client.state:
+                return True
+            if self._last_give_up >= queued_at:
+                return False
+            # The budget starts with this sender's own attempts, not while it waited for the lock
+            deadline = time.monotonic() + self.reconnect_give_up_after
+            while "CONNECTED" not in ws_client.state:
+                try:
+                    await ws_client.connect(user=self.settings.user, password=self.settings.password, loxone_url=self.ws_base_url, receive_updates=False)
+                except Exception as e:
+                    logger.warning(f"WebSocket connection to Miniserver failed: {str(e)}")
+                if "CONNECTED" in ws_client.state:
+                    break
+                delay = min(self.reconnect_max_delay, self.reconnect_base_delay * 2 ** self._reconnect_attempts)
+                delay *= 1 + random.random() * 0.2
+                if time.monotonic() + delay > deadline:
+                    logger.error(f"Giving up WebSocket connection to Miniserver after {self._reconnect_attempts + 1} attempts")
+                    # The next outage starts again with the short delays
+                    self._reconnect_attempts = 0
+                    self._last_give_up = time.monotonic()
+                    return False
+                self._reconnect_attempts += 1
+                logger.warning(f"Retrying WebSocket connection in {delay:.2f} seconds (attempt {self._reconnect_attempts})")
+                await asyncio.sleep(delay)
+            self._reconnect_attempts = 0
+        return True
 
 
     async def send_to_miniserver_via_http(
@@ -69,51 +374,39 @@ class HttpMiniserverHandler:
         topic: str,
         normalized_topic: str,
         value: Any
-    ) -> None:
+    ) -> int:
         """
-        Send data to Miniserver with rate limiting.
-        If mock_ms_ip is provided and enable_mock_miniserver is True, mock server will be used instead of ms_ip.
-        Returns a dictionary with results for each topic.
+        Send data to Miniserver, concurrency is limited by the adaptive limiter and the shared session's connector.
+        If a mock IP is configured and the mock is enabled, the mock server is used instead of the Miniserver IP.
+        Returns the HTTP status code, or 408/503/500 if the request failed (see _ERR_MAP).
+        Cancellation is re-raised, not turned into a status code.
         """
-        # Use mock miniserver IP only if both provided and enabled
-        logger.debug(f"Using miniserver address: {self.target_ip} {'(mock)' if (self.mock_ms_ip and self.enable_mock_miniserver) else '(real)'}")
-
-        async with aiohttp.ClientSession(auth=self.auth, timeout=self.timeout) as session:
-            # Ensure value is converted to string
-            safe_value = str(value)
-            # Use pre-built HTTP base URL
-            url = f"{self.http_base_url}/dev/sps/io/{normalized_topic}/{safe_value}"
-            logger.debug(f"Sending to {url}")
-            
-            try:
-                # Use semaphore to limit concurrent connections
-                async with self.connection_semaphore:
-                    async with session.get(url) as resp:
-                        if resp.status != 200:
-                            logger.warning(f"Miniserver returned {resp.status} for topic {topic} (URL: {url})")
-                        else:
-                            logger.debug(f"Sent {topic}={value} to Miniserver successfully.")
-                        return { 'code': resp.status }
-            except asyncio.TimeoutError:
-                error_msg = f" Error 408: Timeout while sending {topic} (as {normalized_topic})={value} to Miniserver (URL: {url}): request timed out after 10 seconds"
-                logger.error(error_msg)
-                return 
-            except asyncio.CancelledError:
-                error_msg = f"Error 499: Request for {topic} (as {normalized_topic})={value} was cancelled (URL: {url})"
-                logger.error(error_msg)
-                return 
-            except OSError as e:
-                error_msg = f"Error 503: Connection error sending {topic} (as {normalized_topic})={value} to Miniserver (URL: {url}): {str(e)}"
-                logger.error(error_msg)
-                return 
-            except aiohttp.ClientError as e:
-                error_msg = f"Error 500: Client error sending {topic} (as {normalized_topic})={value} to Miniserver (URL: {url}): {str(e)}"
-                logger.error(error_msg)
-                return 
-            except Exception as e:
-                error_msg = f"Error 500: Unexpected error sending {topic} (as {normalized_topic})={value} to Miniserver (URL: {url}): {str(e)}"
-                logger.error(error_msg)
-                return 
+        logger.debug("Using miniserver address: %s %s", self.target_ip, self.target_label)
+
+        session = await self.get_session()
+        # Use pre-built HTTP URL prefix, value is converted to string
+        url = self.http_url_prefix + normalized_topic + "/" + str(value)
+        logger.debug("Sending to %s", url)
+        
+        try:
+            # Adaptive limit below the connector cap, backs off when the Miniserver gets slow or fails
+            async with self.limiter.use() as sample:
+                async with session.get(url) as resp:
+                    if resp.status >= 500:
+                        sample.drop()
+                    if resp.status != 200:
+                        logger.warning(f"Miniserver returned {resp.status} for topic {topic} (URL: {url})")
+                    else:
+                        logger.debug("Sent %s=%s to Miniserver successfully.", topic, value)
+                    return resp.status
+        except asyncio.CancelledError:
+            # Cancellation must reach the caller, the task is being torn down
+            logger.debug("Sending %s to Miniserver cancelled", topic)
+            raise
+        except Exception as e:
+            code, description = _lookup_error(e)
+            logger.error(f"Error {code}: {description} sending {topic} (as {normalized_topic})={value} to Miniserver (URL: {url}): {str(e)}")
+            return code
     
     async def send_to_miniserver(
         self,
@@ -123,21 +416,52 @@ class HttpMiniserverHandler:
     ) -> None:
         """
         Process data and send it to Miniserver.
+        If batching is started, the message is queued and sent with the next micro-batch.
+        When the queue is full (the Miniserver cannot keep up), the message is dropped with a warning.
+        With the mock enabled and debug.mock_shortcircuit set, the message is dropped without any network I/O.
         
         Args:
-            data: The data to process and send
-            mqtt_publish_callback: Callback for MQTT publishing (required for topic forwarding)
+            topic: The original MQTT topic
+            normalized_topic: The topic as Miniserver virtual input name
+            value: The value to send
             
         Returns:
             None
         """
-        logger.debug(f"Sending {topic} (as {normalized_topic})={value} to Miniserver")
+        if self.skip_network:
+            return
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait((topic, normalized_topic, value))
+            except asyncio.QueueFull:
+                logger.warning("Miniserver send queue full, dropping %s", topic)
+            return
+        await self._send(topic, normalized_topic, value)
+
+    async def send_many_to_miniserver(self, items: List[Tuple[str, str, Any]]) -> None:
+        """
+        Send a list of (topic, normalized_topic, value), e.g. flattened JSON, to the Miniserver.
+        If batching is started, every item goes through the same bounded queue as send_to_miniserver,
+        otherwise the list is sent right away with send_batch_to_miniserver.
+        """
+        if self.skip_network:
+            return
+        if self._queue is not None:
+            for topic, normalized_topic, value in items:
+                try:
+                    self._queue.put_nowait((topic, normalized_topic, value))
+                except asyncio.QueueFull:
+                    logger.warning("Miniserver send queue full, dropping %s", topic)
+            return
+        await self.send_batch_to_miniserver(items)
+
+    async def _send(self, topic: str, normalized_topic: str, value: Any) -> int:
+        if self.skip_network:
+            return 200
+        logger.debug("Sending %s (as %s)=%s to Miniserver", topic, normalized_topic, value)
         # Send to Miniserver using WebSocket or HTTP based on config
         if global_config.miniserver.use_websocket:
-            await self.send_to_minisever_via_websocket(topic, normalized_topic, value)
-        else:
-            await self.send_to_miniserver_via_http(topic, normalized_topic, value)
-
-        return 
+            return await self.send_to_minisever_via_websocket(topic, normalized_topic, value)
+        return await self.send_to_miniserver_via_http(topic, normalized_topic, value)
 
 http_miniserver_handler = HttpMiniserverHandler()
\ No newline at end of file
@@ -11,11 +11,21 @@ from typing import Optional
 # Effective log level - set once at startup by setup_logging()
 _log_level: int = logging.INFO
 
+# Per-level switches derived from _log_level, so a disabled call is a single global lookup
+_DEBUG_ON: bool = False
+_INFO_ON: bool = True
+_WARNING_ON: bool = True
+_ERROR_ON: bool = True
+
 
 def set_log_level(level: int):
     """Set the global log level. Called by setup_logging()."""
-    global _log_level
+    global _log_level, _DEBUG_ON, _INFO_ON, _WARNING_ON, _ERROR_ON
     _log_level = level
+    _DEBUG_ON = level <= logging.DEBUG
+    _INFO_ON = level <= logging.INFO
+    _WARNING_ON = level <= logging.WARNING
+    _ERROR_ON = level <= logging.ERROR
 
 
 class LazyLogger:
@@ -27,29 +37,33 @@ class LazyLogger:
         self._logger = logger
     
     def debug(self, msg: str, *args, **kwargs):
-        if _log_level <= logging.DEBUG:
+        if _DEBUG_ON:
             self._logger.debug(msg, *args, **kwargs)
     
     def info(self, msg: str, *args, **kwargs):
-        if _log_level <= logging.INFO:
+        if _INFO_ON:
             self._logger.info(msg, *args, **kwargs)
     
     def warning(self, msg: str, *args, **kwargs):
-        if _log_level <= logging.WARNING:
+        if _WARNING_ON:
             self._logger.warning(msg, *args, **kwargs)
     
     def error(self, msg: str, *args, **kwargs):
-        if _log_level <= logging.ERROR:
+        if _ERROR_ON:
             self._logger.error(msg, *args, **kwargs)
     
     def exception(self, msg: str, *args, **kwargs):
-        if _log_level <= logging.ERROR:
+        if _ERROR_ON:
             self._logger.exception(msg, *args, **kwargs)
     
     def log(self, level: int, msg: str, *args, **kwargs):
         if _log_level <= level:
             self._logger.log(level, msg, *args, **kwargs)
 
+    def isEnabledFor(self, level: int) -> bool:
+        """Same check as the level methods, for callers that have to prepare their arguments."""
+        return _log_level <= level
+
 
 _lazy_loggers: dict[str, LazyLogger] = {}
 
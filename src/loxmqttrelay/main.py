@@ -11,7 +11,7 @@ import platform
 
 from loxmqttrelay.config import ConfigError, ConfigSection, global_config
 from loxmqttrelay.logging_config import get_lazy_logger
-from loxmqttrelay.mqtt_client import mqtt_client
+from loxmqttrelay.mqtt_client import get_mqtt_client
 from loxmqttrelay.udp_handler import start_udp_server
 from loxmqttrelay.miniserver_sync import sync_miniserver_whitelist
 from loxmqttrelay.http_miniserver_handler import http_miniserver_handler
@@ -40,18 +40,39 @@ logger = get_lazy_logger(__name__)
 init_rust_logger()
 
 class MQTTRelay:
+    # Miniserver startup events within this window (seconds) are coalesced into one whitelist sync
+    sync_debounce_delay = 2.0
+
     def __init__(self):
         self.ui_process: Optional[subprocess.Popen] = None
-        self.miniserver_data_processor = MiniserverDataProcessor(TOPIC, global_config, self, mqtt_client, http_miniserver_handler, orjson)
+        self._pending_sync: Optional[asyncio.TimerHandle] = None
+        # Strong references to fire-and-forget tasks, the event loop only keeps weak ones
+        self._bg_tasks: typing.Set[asyncio.Task] = set()
+        self.miniserver_data_processor = MiniserverDataProcessor(TOPIC, global_config, self, get_mqtt_client(), http_miniserver_handler, orjson)
 
     async def main(self):
-        await self.connect_and_subscribe_mqtt()
-        await self.handle_miniserver_sync()
-        asyncio.create_task(start_udp_server())
-        await self.start_ui()
-
-        logger.info("MQTT Relay started")
-        await asyncio.Future()
+        # The handler is closed on every exit, including a failed broker connect during startup
+        try:
+            http_miniserver_handler.start_batching()
+            # The whitelist download runs in a worker thread while the broker connects and the
+            # UDP server and UI start. Subscribing waits for it: retained messages arrive as soon
+            # as the subscriptions are made and have to be filtered against the synced whitelist
+            sync_task = asyncio.create_task(self.handle_miniserver_sync())
+            try:
+                await self.connect_mqtt()
+                self._spawn(start_udp_server())
+                # Headless keeps the UI cold, with --ui-on-demand it can be started via the startui topic
+                if not utils.get_args().headless:
+                    await self.start_ui()
+                await sync_task
+            finally:
+                sync_task.cancel()
+            self.subscribe_mqtt()
+
+            logger.info("MQTT Relay started")
+            await asyncio.Future()
+        finally:
+            await http_miniserver_handler.close()
 
     async def handle_miniserver_sync(self):
         """Attempt to sync whitelist with miniserver if enabled"""        
@@ -62,7 +83,8 @@ class MQTTRelay:
         initial_whitelist = global_config.topics.topic_whitelist.copy()
 
         try:
-            inputs = sync_miniserver_whitelist()
+            # The FTP download blocks, keep it off the event loop
+            inputs = await asyncio.to_thread(sync_miniserver_whitelist)
             global_config.update_config(ConfigSection.TOPICS, {'topic_whitelist': inputs})
             self.miniserver_data_processor.update_topic_whitelist(list(inputs))
             logger.info("Whitelist updated from miniserver configuration")
@@ -74,12 +96,36 @@ class MQTTRelay:
     
     # UPDATED: Synchronous wrapper with added logging to help testing
     def schedule_miniserver_sync(self):
-        """Schedule the asynchronous handle_miniserver_sync in the event loop."""
+        """
+        Schedule the asynchronous handle_miniserver_sync in the event loop.
+        Debounced: every call restarts the timer, so a burst of startup events results in one sync.
+        """
         logger.info("Miniserver startup detected, resyncing whitelist")
-        asyncio.create_task(self.handle_miniserver_sync())
+        if self._pending_sync is not None:
+            self._pending_sync.cancel()
+        self._pending_sync = asyncio.get_running_loop().call_later(self.sync_debounce_delay, self._run_scheduled_sync)
+
+    def _run_scheduled_sync(self):
+        self._pending_sync = None
+        self._spawn(self.handle_miniserver_sync())
+
+    def _spawn(self, coro: typing.Coroutine) -> asyncio.Task:
+        """Run coro as a background task and keep it referenced until it is done."""
+        task = asyncio.create_task(coro)
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+        return task
+
+    async def connect_mqtt(self):
+        """Connect the MQTT client without subscriptions, they are made by subscribe_mqtt()."""
+        try:
+            await get_mqtt_client().connect([], self.miniserver_data_processor.handle_mqtt_message)
+        except Exception as e:
+            logger.error(f"Failed to connect to MQTT broker: {e}")
+            raise ConfigError(f"MQTT connection failed: {e}")
 
-    async def connect_and_subscribe_mqtt(self):
-        """Ensure MQTT client is connected with all required subscriptions."""
+    def subscribe_mqtt(self):
+        """Subscribe to the configured topics plus the configuration and control topics."""
         # Subscribe to configuration topics and miniserver startup event
         all_topics = global_config.topics.subscriptions + [
             TOPIC.CONFIG_SET,
@@ -92,37 +138,34 @@ class MQTTRelay:
             TOPIC.START_UI,
             TOPIC.STOP_UI
         ]
-        
-        try:
-            # Connect with all required subscriptions
-            await mqtt_client.connect(all_topics, self.miniserver_data_processor.handle_mqtt_message)
-        except Exception as e:
-            logger.error(f"Failed to connect to MQTT broker: {e}")
-            raise ConfigError(f"MQTT connection failed: {e}")
+        get_mqtt_client().subscribe(all_topics)
 
     async def start_ui(self):
         """Start the Streamlit UI if it's not already running."""
-        if utils.get_args().headless:
+        args = utils.get_args()
+        # The UI exposes broker and Miniserver credentials, a headless relay only starts it when opted in
+        if args.headless and not args.ui_on_demand:
             return
-            
+
         if self.ui_process is None or self.ui_process.poll() is not None:
             try:
                 # Start the UI using streamlit with absolute path
                 ui_path = os.path.join(os.path.dirname(__file__), "ui.py")
+                # Nobody reads the UI's output, a PIPE would fill up and block Streamlit
                 self.ui_process = subprocess.Popen(
                     ["streamlit", "run", ui_path],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL
                 )
                 logger.info("UI started successfully")
-                await mqtt_client.publish(TOPIC.UI_STATUS, "UI started successfully")
+                await get_mqtt_client().publish(TOPIC.UI_STATUS, "UI started successfully")
             except Exception as e:
                 error_msg = f"Failed to start UI: {e}"
                 logger.error(error_msg)
-                await mqtt_client.publish(TOPIC.UI_STATUS, error_msg)
+                await get_mqtt_client().publish(TOPIC.UI_STATUS, error_msg)
         else:
             logger.info("UI is already running")
-            await mqtt_client.publish(TOPIC.UI_STATUS, "UI is already running")
+            await get_mqtt_client().publish(TOPIC.UI_STATUS, "UI is already running")
 
     async def stop_ui(self):
         """Stop the Streamlit UI if it's running."""
@@ -132,20 +175,20 @@ class MQTTRelay:
                 self.ui_process.wait(timeout=5)  # Wait up to 5 seconds for process to terminate
                 self.ui_process = None
                 logger.info("UI stopped successfully")
-                await mqtt_client.publish(TOPIC.UI_STATUS, "UI stopped successfully")
+                await get_mqtt_client().publish(TOPIC.UI_STATUS, "UI stopped successfully")
             except subprocess.TimeoutExpired:
                 if self.ui_process is not None:
                     self.ui_process.kill()  # Force kill if termination takes too long
                 self.ui_process = None
                 logger.warning("UI process killed after timeout")
-                await mqtt_client.publish(TOPIC.UI_STATUS, "UI process killed after timeout")
+                await get_mqtt_client().publish(TOPIC.UI_STATUS, "UI process killed after timeout")
             except Exception as e:
                 error_msg = f"Error stopping UI: {e}"
                 logger.error(error_msg)
-                await mqtt_client.publish(TOPIC.UI_STATUS, error_msg)
+                await get_mqtt_client().publish(TOPIC.UI_STATUS, error_msg)
         else:
             logger.info("UI is not running")
-            await mqtt_client.publish(TOPIC.UI_STATUS, "UI is not running")
+            await get_mqtt_client().publish(TOPIC.UI_STATUS, "UI is not running")
 
     def restart_relay_incl_ui(self):
         if self.ui_process:
@@ -156,10 +199,11 @@ def main():
     # Initialize logging first
     utils.setup_logging()
     
-    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     relay = MQTTRelay()
     try:
-        asyncio.run(relay.main())
+        # uvloop via loop_factory instead of the (deprecated) global event loop policy
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            runner.run(relay.main())
     except KeyboardInterrupt:
         pass
     finally:
@@ -1,9 +1,8 @@
 from lxml import etree
-from typing import List
+from typing import List, Optional, Tuple
 import ftplib
 import struct
 import zipfile
-import zlib
 from io import BytesIO
 from .config import global_config
 from .logging_config import get_lazy_logger
@@ -15,6 +14,35 @@ import lz4.frame as lz4f
 
 logger = get_lazy_logger(__name__)
 
+try:
+    # Optional (speedups extra): zlib-ng computes crc32 with CLMUL/VPCLMULQDQ
+    from zlib_ng import zlib_ng as zlib
+except ImportError:
+    import zlib
+
+# Chunk size for the FTP download, ftplib defaults to 8 KiB
+_FTP_BLOCKSIZE = 256 * 1024
+
+# Output chunk size when decoding LZ4 frames, each chunk is checksummed while still in cache
+_FRAME_CHUNK = 256 * 1024
+
+# Chunk size when feeding the config XML to the parser, lxml needs bytes so each chunk is copied once
+_PARSE_CHUNK = 64 * 1024
+
+# LoxCC header: magic, compressed size, uncompressed size, CRC32 of the uncompressed data
+_LOXCC_HEADER = struct.Struct('<LLLL')
+
+# Zip records used to locate a stored member without going through zipfile
+_ZIP_EOCD = struct.Struct('<4s4H2LH')
+_ZIP_CENTRAL_HEADER = struct.Struct('<4s6H3L5H2L')
+_ZIP_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+# Configuration files in the prog folder, e.g. sps_123_20240101120000.zip
+_SPS_PATTERN = re.compile(r'(sps_\d+_\d+\.(?:zip|LoxCC))')
+
+# Titles of all controls below a VirtualInCaption, evaluated inside libxml2
+_TITLES_XPATH = etree.XPath('.//C[@Type="VirtualInCaption"]//C[@Title != ""]/@Title', smart_strings=False)
+
 def _is_lz4_frame(data: bytes) -> bool:
     """
     Extended LZ4 frame detection including skippable frames.
@@ -24,25 +52,111 @@ def _is_lz4_frame(data: bytes) -> bool:
     m = int.from_bytes(data[:4], "little")
     return m in (0x184D2204, 0x184C2102) or 0x184D2A50 <= m <= 0x184D2A5F
 
-def _decompress_loxcc_block_lz4(data: bytes, uncompressed_size: int) -> bytes:
+def _decompress_lz4_frame(data: bytes) -> Tuple[bytearray, int]:
+    """
+    Decode an LZ4 frame chunk by chunk, computing the CRC32 of the output in the same pass.
+    """
+    dctx = lz4f.create_decompression_context()
+    view = memoryview(data)
+    result = bytearray()
+    crc = 0
+    eof = False
+    while view and not eof:
+        chunk, bytes_read, eof = lz4f.decompress_chunk(dctx, view, max_length=_FRAME_CHUNK)
+        if not bytes_read and not chunk:
+            raise ValueError("Truncated LZ4 frame")
+        crc = zlib.crc32(chunk, crc)
+        result += chunk
+        view = view[bytes_read:]
+    return result, crc
+
+def _decompress_loxcc_block_lz4(data: bytes, uncompressed_size: int) -> Tuple[bytes | bytearray, int]:
     """
     LZ4 decompression function for LoxCC blocks.
     Extended automatic detection of LZ4-Frame vs. LZ4-Block.
-    Extremely fast compared to the current implementation.
+    Returns the decompressed data together with its CRC32.
     """
     if _is_lz4_frame(data):
-        return lz4f.decompress(data)
+        return _decompress_lz4_frame(data)
     try:
-        return lz4b.decompress(data, uncompressed_size=uncompressed_size)
+        result = lz4b.decompress(data, uncompressed_size=uncompressed_size)
     except Exception as e:
         # last attempt: possibly misidentified
         try:
-            return lz4f.decompress(data)
+            return _decompress_lz4_frame(data)
         except Exception:
             raise ValueError(f"LZ4 decompression failed: {e}")
+    # Block decoding is one-shot, so the checksum needs its own pass
+    return result, zlib.crc32(memoryview(result))
+
+def _find_stored_member(archive: bytearray, name: str) -> Optional[memoryview]:
+    """
+    Return a view on the raw bytes of an uncompressed (STORED) zip member, or None if the
+    member is missing, compressed or the archive uses features not handled here (e.g. Zip64).
+    The LoxCC payload is already LZ4 compressed, so it is usually stored as is.
+    """
+    eocd = archive.rfind(b"PK\x05\x06", max(0, len(archive) - _ZIP_EOCD.size - 0xFFFF))
+    if eocd < 0 or eocd + _ZIP_EOCD.size > len(archive):
+        return None
+    _, _, _, _, entries, _, pos, _ = _ZIP_EOCD.unpack_from(archive, eocd)
+    encoded_name = name.encode()
+    for _ in range(entries):
+        if pos + _ZIP_CENTRAL_HEADER.size > len(archive):
+            return None
+        (signature, _, _, _, method, _, _, _, size, _,
+         name_len, extra_len, comment_len, _, _, _, offset) = _ZIP_CENTRAL_HEADER.unpack_from(archive, pos)
+        if signature != b"PK\x01\x02":
+            return None
+        entry_name = archive[pos + _ZIP_CENTRAL_HEADER.size:pos + _ZIP_CENTRAL_HEADER.size + name_len]
+        pos += _ZIP_CENTRAL_HEADER.size + name_len + extra_len + comment_len
+        if entry_name != encoded_name:
+            continue
+        if method != zipfile.ZIP_STORED or size == 0xFFFFFFFF or offset + _ZIP_LOCAL_HEADER.size > len(archive):
+            return None
+        local = _ZIP_LOCAL_HEADER.unpack_from(archive, offset)
+        if local[0] != b"PK\x03\x04":
+            return None
+        start = offset + _ZIP_LOCAL_HEADER.size + local[-2] + local[-1]
+        if start + size > len(archive):
+            return None
+        return memoryview(archive)[start:start + size]
+    return None
+
+def _download_file(ftp: ftplib.FTP, path: str) -> bytearray:
+    """
+    Download path into a buffer preallocated from the size reported by the server,
+    so the transfer never reallocates and copies the buffer while it grows.
+    Falls back to a growing buffer if the server does not support SIZE.
+    """
+    try:
+        ftp.voidcmd("TYPE I")
+        size = ftp.size(path)
+    except ftplib.all_errors:
+        size = None
+    if not size:
+        buf = bytearray()
+        ftp.retrbinary(f"RETR {path}", buf.extend, blocksize=_FTP_BLOCKSIZE)
+        return buf
+
+    buf = bytearray(size)
+    view = memoryview(buf)
+    offset = 0
+
+    def write(chunk: bytes) -> None:
+        nonlocal offset
+        end = offset + len(chunk)
+        if end > size:
+            raise Exception(f"Download of {path} exceeds the reported size of {size} bytes")
+        view[offset:end] = chunk
+        offset = end
 
+    ftp.retrbinary(f"RETR {path}", write, blocksize=_FTP_BLOCKSIZE)
+    view.release()
+    if offset != size:
+        raise Exception(f"Download of {path} incomplete: got {offset} of {size} bytes")
+    return buf
 
-def load_miniserver_config(ip: str, username: str, password: str) -> bytes:
+def load_miniserver_config(ip: str, username: str, password: str) -> bytes | bytearray:
     """
     Load the most recent version of the currently active configuration file
     from the Miniserver via FTP.
@@ -69,9 +183,8 @@ def load_miniserver_config(ip: str, username: str, password: str) -> bytes:
         
         # Find the most recent configuration file
         filelist = []
-        pattern = r'(sps_\d+_\d+\.(?:zip|LoxCC))'
         for line in ftp.nlst():
-            match = re.search(pattern, line)
+            match = _SPS_PATTERN.search(line)
             if match:
                 filelist.append(match.group(1))
         
@@ -79,77 +192,113 @@ def load_miniserver_config(ip: str, username: str, password: str) -> bytes:
             raise Exception("No configuration files found")
         
                     
-        filename = sorted(filelist)[-1]
+        filename = max(filelist)
         logger.info(f"Selected configuration file: {filename}")
         
         # Download the file
-        download_file = BytesIO()
-        ftp.retrbinary(f"RETR /prog/{filename}", download_file.write)
-        download_file.seek(0)
+        buf = _download_file(ftp, f"/prog/{filename}")
         ftp.quit()
 
-        # Extract and decompress the configuration
-        zf = zipfile.ZipFile(download_file)
-        with zf.open('sps0.LoxCC') as f:
-            header, = struct.unpack('<L', f.read(4))
-            if header != 0xaabbccee:
-                raise Exception("Invalid file format")
+        # Extract the LoxCC member, sliced straight out of the download when it is stored uncompressed
+        loxcc = _find_stored_member(buf, 'sps0.LoxCC')
+        if loxcc is None:
+            loxcc = zipfile.ZipFile(BytesIO(buf)).read('sps0.LoxCC')
+
+        header, compressedSize, uncompressedSize, checksum = _LOXCC_HEADER.unpack_from(loxcc)
+        if header != 0xaabbccee:
+            raise Exception("Invalid file format")
+
+        data = loxcc[_LOXCC_HEADER.size:_LOXCC_HEADER.size + compressedSize]
+        
+        # Strict payload length validation
+        if len(data) != compressedSize:
+            raise Exception(f"Payload length mismatch: got {len(data)}, expected {compressedSize}")
+        
+        # Decompression method - always LZ4
+        logger.debug("Using LZ4 decompression")
+        resultStr, crc = _decompress_loxcc_block_lz4(data, uncompressedSize)
                 
-            compressedSize, uncompressedSize, checksum, = struct.unpack('<LLL', f.read(12))
-            data = f.read(compressedSize)
+        if checksum != crc:
+            raise Exception('Checksum verification failed')
             
-            # Strict payload length validation
-            if len(data) != compressedSize:
-                raise Exception(f"Payload length mismatch: got {len(data)}, expected {compressedSize}")
+        if len(resultStr) != uncompressedSize:
+            raise Exception(f'Uncompressed filesize mismatch: {len(resultStr)} != {uncompressedSize}')
             
-            # Decompression method - always LZ4
-            logger.debug("Using LZ4 decompression")
-            resultStr = _decompress_loxcc_block_lz4(data, uncompressedSize)
-                    
-            if checksum != zlib.crc32(resultStr):
-                raise Exception('Checksum verification failed')
-                
-            if len(resultStr) != uncompressedSize:
-                raise Exception(f'Uncompressed filesize mismatch: {len(resultStr)} != {uncompressedSize}')
-                
-            # Return raw bytes - let XML parser handle encoding detection
-            return bytes(resultStr)
+        # Return the decompressed buffer as is - let XML parser handle encoding detection
+        return resultStr
             
     except Exception as e:
         logger.error(f"Error loading miniserver configuration: {str(e)}")
         raise
 
-def extract_inputs(config_xml: bytes) -> List[str]:
+def _feed_chunks(config_xml: bytes | bytearray | memoryview):
+    # Slices of a memoryview share the buffer, only the current chunk is materialized as bytes
+    view = memoryview(config_xml)
+    for i in range(0, len(view), _PARSE_CHUNK):
+        yield view[i:i + _PARSE_CHUNK].tobytes()
+
+def _iter_input_titles(config_xml: bytes | bytearray | memoryview) -> List[str]:
+    """
+    Collect the titles below VirtualInCaption controls in a single streaming pass.
+    Processed elements are cleared, so memory stays proportional to the tree depth.
+    """
+    titles = []
+    depth_in_vic = 0
+    parser = etree.XMLPullParser(events=("start", "end"), tag="C")
+    for chunk in _feed_chunks(config_xml):
+        parser.feed(chunk)
+        depth_in_vic = _collect_titles(parser.read_events(), titles, depth_in_vic)
+    parser.close()
+    _collect_titles(parser.read_events(), titles, depth_in_vic)
+    return titles
+
+def _collect_titles(events, titles: List[str], depth_in_vic: int) -> int:
+    for event, elem in events:
+        is_vic = elem.get("Type") == "VirtualInCaption"
+        if event == "start":
+            if depth_in_vic:
+                title = elem.get("Title")
+                if title:
+                    titles.append(title)
+            if is_vic:
+                depth_in_vic += 1
+        else:
+            if is_vic:
+                depth_in_vic -= 1
+            elem.clear(keep_tail=True)
+            # The root has no parent, but comments or PIs before it still show up as its siblings
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+    return depth_in_vic
+
+def extract_inputs(config_xml: bytes | bytearray | memoryview) -> List[str]:
     """
     Extract all possible inputs from the Loxone configuration XML.
     """
     # Try normal XML parsing first
     try:
-        root = etree.fromstring(config_xml)
+        titles = _iter_input_titles(config_xml)
         logger.info("XML parsed successfully with standard parser")
+        logger.info(f"Extracted {len(titles)} inputs from configuration")
+        return titles
     except etree.XMLSyntaxError as e:
         logger.warning(f"Standard XML parsing failed: {str(e)}")
         logger.warning("Attempting XML parsing with recovery mode for malformed XML")
         
         # Use lxml recovery mode for malformed XML (handles duplicate attributes, encoding issues, etc.)
         parser = etree.XMLParser(recover=True)
-        root = etree.fromstring(config_xml, parser)
+        for chunk in _feed_chunks(config_xml):
+            parser.feed(chunk)
+        root = parser.close()
+        if root is None:
+            raise Exception("No XML element could be recovered from the configuration")
         logger.warning("Successfully parsed malformed XML using lxml recovery mode")
     
     # Extract titles from parsed XML
     try:
-        titles = []
-
-        def find_titles_under_virtual_in_caption(element):
-            if element.tag == "C" and element.get("Type") == "VirtualInCaption":
-                for child in element.findall(".//C"):
-                    title = child.get("Title")
-                    if title:
-                        titles.append(title)
-            for child in element:
-                find_titles_under_virtual_in_caption(child)
-
-        find_titles_under_virtual_in_caption(root)
+        titles = _TITLES_XPATH(root)
         logger.info(f"Extracted {len(titles)} inputs from configuration")
         return titles
 
@@ -171,7 +320,7 @@ def sync_miniserver_whitelist() -> List[str]:
         ms_ip = global_config.miniserver.miniserver_ip.split(':')[0]
         
         # Load the configuration from miniserver
-        config_xml = load_miniserver_config(
+        config_xml: bytes | bytearray = load_miniserver_config(
             ms_ip,
             global_config.miniserver.miniserver_user,
             global_config.miniserver.miniserver_pass
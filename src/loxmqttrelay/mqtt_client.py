@@ -1,7 +1,8 @@
 import asyncio
+import functools
 import time
-from typing import List, Callable, Awaitable
-from gmqtt import Client
+from typing import List, Callable
+from gmqtt import Client, Subscription
 from gmqtt import constants as MQTTconstants
 from gmqtt.mqtt.constants import PubAckReasonCode
 from .config import global_config
@@ -19,10 +20,12 @@ class MQTTClient:
         unique_id = f"loxberry_{int(time.time())}"
         self.client = Client(client_id=unique_id, logger=logger)
         self.base_topic = global_config.general.base_topic
-        self._callback: Callable[[str, str], Awaitable[None]]
+        self._status_topic = f"{self.base_topic}status"
+        self._callback: Callable[[str, bytes], None]
         self._max_reconnect_delay = 15 
         self._reconnect_attempt = 0
-        self._conn = asyncio.Event()
+        # Plain flag instead of an asyncio.Event, nothing waits on the connection state
+        self._connected = False
         self.client.on_connect = self._on_connect
         self.client.on_disconnect = self._on_disconnect
         self.client.on_message = self._on_message
@@ -30,17 +33,17 @@ class MQTTClient:
         if global_config.broker.user is not None:
             self.client.set_auth_credentials(global_config.broker.user, global_config.broker.password)
                     
-    async def connect(self, topics: List[str], callback: Callable[[str, str], Awaitable[None]]) -> None:
+    async def connect(self, topics: List[str], callback: Callable[[str, bytes], None]) -> None:
         """
         Connect to the MQTT broker and set up subscriptions.
         
         Args:
-            topics: List of topics to subscribe to
-            callback: Callback function for handling received messages
+            topics: List of topics to subscribe to, may be empty and set later with subscribe()
+            callback: Synchronous handler called with the topic and the raw payload bytes
         """
         self._callback = callback
         self._topics = topics
-        self._conn.clear()
+        self._connected = False
         
         while True:
             try:
@@ -58,12 +61,22 @@ class MQTTClient:
                 logger.warning(f"Retrying connection in {self._max_reconnect_delay} seconds...")
                 await asyncio.sleep(self._max_reconnect_delay)
 
+    def subscribe(self, topics: List[str]) -> None:
+        """
+        Subscribe to topics after connect(), e.g. once the whitelist is in place.
+        The topics are kept and subscribed again on every reconnect.
+        """
+        self._topics = topics
+        if self._connected and topics:
+            logger.info(f"Subscribing {topics}")
+            self.client.subscribe([Subscription(topic) for topic in topics])
+
     async def disconnect(self) -> None:
         """Disconnect from the MQTT broker."""
         if self.client:
             try:
                 if self.client.is_connected:
-                    self.client.publish(f"{self.base_topic}status", "Disconnecting")
+                    self.client.publish(self._status_topic, "Disconnecting")
             except Exception:
                 logger.warning("Failed to publish disconnect status", exc_info=True)
             finally:
@@ -82,12 +95,12 @@ class MQTTClient:
 
     async def publish(self, topic: str, message: str | bytes, retain: bool = False) -> None:
         try:
-            if not self._conn.is_set():
+            if not self._connected:
                 logger.warning("MQTT publish attempted without connection")
                 return
 
             self.client.publish(topic, message, qos=0, retain=retain)
-            logger.debug(f"Published: {topic} = {message!r} (retain={retain})")
+            logger.debug("Published: %s = %r (retain=%s)", topic, message, retain)
 
         except Exception as e:
             logger.error(f"Fatal error during publish: {e}")
@@ -95,20 +108,24 @@ class MQTTClient:
     
     def _on_connect(self, session_present, result, properties, userdata):
         # Publish connection status
-        self.client.publish(f"{self.base_topic}status", "Connected")
+        self.client.publish(self._status_topic, "Connected")
         logger.info(f"Connected to MQTT Server {global_config.broker.host}:{global_config.broker.port}")
         logger.info("MQTT connected")
         # Wait for connection to be established
         # Connection successful, subscribe to topics
         logger.info(f"Subscribing {self._topics}")
-        for topic in self._topics:
-            self.client.subscribe(topic)
-        self._conn.set()
+        # One SUBSCRIBE packet for all topics instead of one round-trip per topic
+        if self._topics:
+            self.client.subscribe([Subscription(topic) for topic in self._topics])
+        self._connected = True
     
     def _on_disconnect(self,client, packet, exc=None):
         logger.info("MQTT disconnected")
         if exc:
             logger.error(f"Disconnect error: {exc}")
-        self._conn.clear()
+        self._connected = False
 
-mqtt_client = MQTTClient()
\ No newline at end of file
+@functools.cache
+def get_mqtt_client() -> MQTTClient:
+    """Return the shared MQTTClient, creating it on first use instead of at import."""
+    return MQTTClient()
@@ -1,12 +1,67 @@
 import asyncio
-from typing import Tuple, Optional
+import logging
+import re
+from typing import List, Tuple, Optional
 from loxmqttrelay.config import global_config
 from loxmqttrelay.logging_config import get_lazy_logger
-from loxmqttrelay.mqtt_client import mqtt_client
+from loxmqttrelay.mqtt_client import get_mqtt_client
 
 logger = get_lazy_logger(__name__)
 
-def parse_udp_message(udpmsg: str) -> Optional[Tuple[str, str, str]]:
+# Command detection on the first 8 bytes as one little-endian integer: OR-ing 0x20 into
+# every byte lowercases ASCII letters, then the keyword bytes are compared in one go
+_CASE_FOLD = 0x2020202020202020
+_PUBLISH = int.from_bytes(b"publish", "little")
+_PUBLISH_MASK = (1 << 56) - 1
+_RETAIN = int.from_bytes(b"retain", "little")
+_RETAIN_MASK = (1 << 48) - 1
+_ASCII_WHITESPACE = frozenset(b" \t\n\r\x0b\x0c")
+
+# First byte -> candidate command (1 = publish, 2 = retain, 0 = none). Most messages carry
+# no command, so they are settled by this single lookup
+_COMMAND_HINT = bytearray(256)
+_COMMAND_HINT[ord("p")] = _COMMAND_HINT[ord("P")] = 1
+_COMMAND_HINT[ord("r")] = _COMMAND_HINT[ord("R")] = 2
+
+# Topic prefix of a message without JSON payload, matched in one pass (see parse_udp_message):
+# the first token is always part of the topic, every further token only if another token
+# follows it and it either contains a slash or sits between two slash-containing tokens
+_SLASH_TOKEN = rb"[^\s/]*/\S*"
+_PLAIN_TOKEN = rb"[^\s/]+"
+_MORE_SLASH = rb"(?:\s+" + _SLASH_TOKEN + rb"(?=\s+\S))"
+_SANDWICHED = rb"(?:\s+" + _PLAIN_TOKEN + rb"(?=\s+" + _SLASH_TOKEN + rb"))"
+_AFTER_SLASH = rb"(?:" + _MORE_SLASH + rb"|" + _SANDWICHED + _MORE_SLASH + rb"?)*"
+_TOPIC_RE = re.compile(
+    rb"(?:" + _SLASH_TOKEN + _AFTER_SLASH + rb"|" + _PLAIN_TOKEN + rb"(?:" + _MORE_SLASH + _AFTER_SLASH + rb")?)"
+)
+
+def _match_command(buf: bytes, lo: int, hi: int) -> Optional[Tuple[str, int]]:
+    """Return (command, keyword length) if buf[lo:hi] starts with a command keyword followed by whitespace or the end."""
+    hint = _COMMAND_HINT[buf[lo]]
+    if not hint:
+        return None
+    head = int.from_bytes(buf[lo:lo + 8], "little") | _CASE_FOLD
+    if hint == 1:
+        if head & _PUBLISH_MASK == _PUBLISH and (hi - lo == 7 or buf[lo + 7] in _ASCII_WHITESPACE):
+            return "publish", 7
+    elif head & _RETAIN_MASK == _RETAIN and (hi - lo == 6 or buf[lo + 6] in _ASCII_WHITESPACE):
+        return "retain", 6
+    return None
+
+def _lstrip_ws(buf: bytes, lo: int, hi: int) -> int:
+    while lo < hi and buf[lo] in _ASCII_WHITESPACE:
+        lo += 1
+    return lo
+
+def _rstrip_ws(buf: bytes, lo: int, hi: int) -> int:
+    while hi > lo and buf[hi - 1] in _ASCII_WHITESPACE:
+        hi -= 1
+    return hi
+
+def _text(b: bytes) -> str:
+    return b.decode('utf-8', errors='ignore')
+
+def parse_udp_message(udpmsg: bytes | str) -> Optional[Tuple[str, str, str]]:
     """
     Parse an incoming UDP message into (command, topic, message) according to:
       - If the first word (case-insensitive) is "publish"/"retain", use it as command.
@@ -22,126 +77,113 @@ def parse_udp_message(udpmsg: str) -> Optional[Tuple[str, str, str]]:
                      (token between 2 Tokens with Slash).
                    Stop when we find a token, that doesn't fit.
                    Everything after that (plus possibly the last token) is payload.
+    The scanning works on (lo, hi) indices into the raw bytes, only topic and payload
+    are sliced out and decoded at the end.
     Returns None, if parsing fails.
     """
+    buf = udpmsg.encode('utf-8') if isinstance(udpmsg, str) else udpmsg
 
-    msg = udpmsg.strip()
-    if not msg:
+    lo = _lstrip_ws(buf, 0, len(buf))
+    hi = _rstrip_ws(buf, lo, len(buf))
+    if lo == hi:
         logger.warning("Empty UDP message")
         return None
 
     # --- 1) Determine command
-    parts = msg.split(None, 1)  # split once after the first whitespace
-    if not parts:
-        return None
-
-    first_token = parts[0].lower()
-    if first_token in ("publish", "retain"):
-        command = first_token
-        if len(parts) < 2:
+    matched = _match_command(buf, lo, hi)
+    if matched is not None:
+        command, keyword_len = matched
+        # The rest starts after the keyword
+        rest_lo = _lstrip_ws(buf, lo + keyword_len, hi)
+        if rest_lo == hi:
             # Nothing left -> invalid
-            logger.error(f"Missing topic/payload after command: {msg}")
+            logger.error(f"Missing topic/payload after command: {_text(buf[lo:hi])}")
             return None
-        rest = parts[1].strip()
     else:
         command = "publish"
         # The whole msg is "rest"
-        rest = msg
-
-    if not rest:
-        logger.error(f"No topic/message after command: {msg}")
-        return None
+        rest_lo = lo
 
     # --- 2) JSON-Special: If { in string, from first { -> payload, before -> topic
-    brace_index = rest.find("{")
+    brace_index = buf.find(b"{", rest_lo, hi)
     if brace_index != -1:
-        topic_part = rest[:brace_index].rstrip()
-        payload_part = rest[brace_index:].strip()
+        topic_hi = _rstrip_ws(buf, rest_lo, brace_index)
 
-        # minimal check
-        if not topic_part or not payload_part:
-            logger.error(f"Invalid format - topic or payload empty: {msg}")
+        # minimal check, the payload holds at least the brace
+        if topic_hi == rest_lo:
+            logger.error(f"Invalid format - topic or payload empty: {_text(buf[lo:hi])}")
             return None
 
-        return (command, topic_part, payload_part)
-
-    # --- 3) Otherwise split normally
-    tokens = rest.split()
-    if len(tokens) < 2:
-        logger.error(f"Invalid format - need at least topic + payload: {msg}")
-        return None
+        return (command, _text(buf[rest_lo:topic_hi]), _text(buf[brace_index:hi]))
 
-    if len(tokens) == 2:
-        # Trivial: topic, message
-        topic_part, payload_part = tokens
-        return (command, topic_part, payload_part)
-
-    # --- 4) More than 2 Tokens -> greedy topic-splitting rule
-    def has_slash(s: str) -> bool:
-        return "/" in s
-
-    topic_list = []
-    n = len(tokens)
-
-    # Take first token in topic
-    topic_list.append(tokens[0])
-    i = 1
-    # We run until the second-to-last token, because the last one must be a payload
-    while i < (n - 1):
-        t_current = tokens[i]
-        # Condition: we keep t_current in topic, if
-        #   (t_current has Slash) or
-        #   (it is "sandwiched" between two Slash-containing tokens)
-        # Otherwise we break and the rest -> payload
-        left_has_slash = has_slash(tokens[i - 1])
-        right_has_slash = has_slash(tokens[i + 1])
-        curr_has_slash = has_slash(t_current)
-
-        if curr_has_slash or (left_has_slash and right_has_slash):
-            topic_list.append(t_current)
-            i += 1
-        else:
-            # Break, rest -> payload
-            break
-
-    # i now points to the start of the payload (possibly n-1, if everything was "slash-framed")
-    payload_tokens = tokens[i:]
-    topic_str = " ".join(topic_list).strip()
-    payload_str = " ".join(payload_tokens).strip()
-
-    if not topic_str or not payload_str:
-        logger.error(f"Invalid format - empty topic or payload: {msg}")
+    # --- 3) Otherwise the greedy topic-splitting rule, evaluated by _TOPIC_RE in a single scan.
+    # With exactly 2 tokens this yields topic, message; the last token is always payload
+    topic_hi = _TOPIC_RE.match(buf, rest_lo, hi).end()
+    payload_lo = _lstrip_ws(buf, topic_hi, hi)
+    if payload_lo == hi:
+        logger.error(f"Invalid format - need at least topic + payload: {_text(buf[lo:hi])}")
         return None
 
-    return (command, topic_str, payload_str)
+    # Topic and payload are contiguous in the message, so they are sliced as sent
+    return (command, _text(buf[rest_lo:topic_hi]), _text(buf[payload_lo:hi]))
 
 
-async def handle_udp_message(udpmsg: str, addr) -> None:
+async def handle_udp_message(udpmsg: bytes | str, addr) -> None:
     """
     Handle an incoming UDP message:
       - parse
       - publish to MQTT with or without retain flag
     """
-    logger.info(f"UDP IN: {addr}: {udpmsg}")
+    if logger.isEnabledFor(logging.INFO):
+        # Decode for a readable log line, only when it is actually emitted
+        logger.info("UDP IN: %s: %s", addr, udpmsg.decode("utf-8", "replace") if isinstance(udpmsg, bytes) else udpmsg)
     result = parse_udp_message(udpmsg)
     if result is None:
         return
 
+    # parse_udp_message only yields "publish" or "retain"
     command, topic, message = result
-    if command == 'publish':
-        logger.debug(f"Publishing: '{topic}'='{message}'")
-        await mqtt_client.publish(topic, message, False)
-    elif command == 'retain':
-        logger.debug(f"Publishing (retain): '{topic}'='{message}'")
-        await mqtt_client.publish(topic, message, True)
-    else:
-        logger.error(f"Unknown command in UDP handler: {command}")
+    retain = command == 'retain'
+    logger.debug("Publishing (retain=%s): '%s'='%s'", retain, topic, message)
+    await get_mqtt_client().publish(topic, message, retain)
 
 
 class UDPProtocol(asyncio.DatagramProtocol):
+    """
+    Queues incoming datagrams for a small pool of long-lived workers instead of
+    spawning one task per datagram. When the queue is full, datagrams are dropped.
+    """
+    queue_size = 1024
+    worker_count = 4
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers: List[asyncio.Task] = []
+
+    def connection_made(self, transport):
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    def connection_lost(self, exc):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
     def datagram_received(self, data, addr):
-        msg = data.decode('utf-8', errors='ignore')
-        asyncio.create_task(handle_udp_message(msg, addr))
+        try:
+            self.queue.put_nowait((data, addr))
+        except asyncio.QueueFull:
+            logger.warning("UDP queue full, dropping datagram from %s", addr)
+
+    async def _worker(self):
+        while True:
+            data, addr = await self.queue.get()
+            try:
+                # The parser works on the raw bytes and only decodes topic and payload
+                await handle_udp_message(data, addr)
+            except Exception:
+                logger.exception("Error handling UDP message from %s", addr)
+            finally:
+                self.queue.task_done()
 
 
 async def start_udp_server():
@@ -56,12 +56,14 @@ initial_values = {
         'miniserver_user': '',
         'miniserver_pass': '',
         'miniserver_max_parallel_connections': 5,
+        'miniserver_verify_ssl': False,
         'use_websocket': True,
         'sync_with_miniserver': False
     },
     'debug': {
         'mock_ip': '',
-        'enable_mock': False
+        'enable_mock': False,
+        'mock_shortcircuit': False
     },
     'topics': {
         'subscriptions': [],
@@ -282,12 +284,14 @@ def save_config(save_path: Path):
             'miniserver_user': st.session_state.miniserver_user,
             'miniserver_pass': st.session_state.miniserver_pass,
             'miniserver_max_parallel_connections': st.session_state.miniserver_max_parallel_connections,
+            'miniserver_verify_ssl': st.session_state.miniserver_verify_ssl,
             'use_websocket': st.session_state.use_websocket,
             'sync_with_miniserver': st.session_state.sync_with_miniserver
         },
         'debug': {
             'mock_ip': mock_miniserver_ip,
-            'enable_mock': st.session_state.enable_mock_miniserver
+            'enable_mock': st.session_state.enable_mock_miniserver,
+            'mock_shortcircuit': st.session_state.mock_shortcircuit
         },
         'topics': {
             'subscriptions': [line.strip() for line in st.session_state.subscriptions.splitlines() if line.strip()],
@@ -458,6 +462,7 @@ with st.form("config_form"):
                                                       value=miniserver.get('miniserver_max_parallel_connections', 5),
                                                       min_value=1, max_value=100,
                                                       key='miniserver_max_parallel_connections')
+    miniserver_verify_ssl = st.checkbox("Verify TLS Certificate (port 443)", value=miniserver.get('miniserver_verify_ssl', False), key='miniserver_verify_ssl')
     use_websocket = st.checkbox("Use WebSocket", value=miniserver.get('use_websocket', True), key='use_websocket')
     sync_with_miniserver = st.checkbox("Sync with Miniserver", value=miniserver.get('sync_with_miniserver', False), key='sync_with_miniserver')
 
@@ -465,6 +470,7 @@ with st.form("config_form"):
     debug = config_data.get('debug', {})
     mock_miniserver_ip = st.text_input("Mock Miniserver IP/Port", value=debug.get('mock_ip', ''), key='mock_miniserver_ip')
     enable_mock_miniserver = st.checkbox("Enable Mock Miniserver", value=debug.get('enable_mock', False), key='enable_mock_miniserver')
+    mock_shortcircuit = st.checkbox("Skip Network in Mock Mode", value=debug.get('mock_shortcircuit', False), key='mock_shortcircuit')
 
     st.subheader("Topics")
     topics = config_data.get('topics', {})
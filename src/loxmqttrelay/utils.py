@@ -60,6 +60,11 @@ def get_args() -> argparse.Namespace:
             action="store_true",
             help="Start the MQTT Relay without the UI"
         )
+        _parser.add_argument(
+            "--ui-on-demand",
+            action="store_true",
+            help="In headless mode, allow starting the UI via the startui MQTT topic"
+        )
         
         # When running tests, ignore unknown arguments
         if 'pytest' in sys.modules:
@@ -3,14 +3,14 @@ import pytest
 from loxmqttrelay.config import (
     Config, BrokerConfig, AppConfig,
      MiniserverConfig,
-    ConfigSection, global_config
+    ConfigSection, global_config, get_config
 )
 @pytest.fixture(autouse=True)
 def reset_config():
-    """Reset Config singleton before and after each test"""
-    Config._instance = None
+    """Reset the shared Config cache before and after each test"""
+    get_config.cache_clear()
     yield
-    Config._instance = None
+    get_config.cache_clear()
 
 @pytest.fixture
 def temp_config_file(tmp_path):
@@ -262,6 +262,21 @@ def test_save_config(tmp_path, config_instance):
     assert new_config.general.log_level == "DEBUG"
     assert new_config.broker.port == 1885
 
+def test_save_config_skips_unchanged(tmp_path, config_instance):
+    """Test that saving identical state does not rewrite the file and leaves no temp file behind"""
+    save_path = tmp_path / "saved_config.toml"
+    config_instance.config_path = str(save_path)
+    config_instance.save_config()
+
+    save_path.write_text("sentinel")
+    config_instance.save_config()
+    assert save_path.read_text() == "sentinel"
+
+    config_instance.general.log_level = "ERROR"
+    config_instance.save_config()
+    assert 'log_level = "ERROR"' in save_path.read_text()
+    assert not (tmp_path / "saved_config.toml.tmp").exists()
+
 def test_update_fields(config_instance):
     """Test updating multiple fields at once"""
     updates = {
@@ -273,6 +288,17 @@ def test_update_fields(config_instance):
     assert config_instance.general.log_level == "WARNING"
     assert config_instance.general.cache_size == 200000
 
+def test_update_fields_saves_once(config_instance, monkeypatch):
+    """Test that a batch update serializes the config only once"""
+    save_calls = []
+    monkeypatch.setattr(config_instance, "save_config", lambda: save_calls.append(1))
+    config_instance.update_fields({"log_level": "ERROR", "cache_size": 5000, "port": 1884})
+    assert len(save_calls) == 1
+
+    config_instance.update_field("log_level", "INFO", defer_save=True)
+    assert len(save_calls) == 1
+    assert config_instance.general.log_level == "INFO"
+
 def test_thread_safety(tmp_path):
     """Test that Config is thread-safe"""
     config_path = tmp_path / "thread_safe_config.toml"
@@ -284,17 +310,15 @@ cache_size = 100000
 """
     config_path.write_text(test_config)
     
-    # Initialize the Config singleton first
-    config = Config()
-    config.config_path = str(config_path)
-    config._config = config._load_config()
+    # Initialize the shared Config first
+    config = get_config(str(config_path))
     
     import threading
     results = []
     
     def access_config():
-        # Access the existing singleton
-        config = Config()
+        # Access the existing shared instance
+        config = get_config(str(config_path))
         results.append(config.general.base_topic)
     
     threads = [threading.Thread(target=access_config) for _ in range(10)]
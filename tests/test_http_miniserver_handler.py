@@ -1,9 +1,9 @@
 import pytest
 import pytest_asyncio
 from unittest.mock import AsyncMock, patch, MagicMock
-from loxmqttrelay.http_miniserver_handler import HttpMiniserverHandler
-from loxmqttrelay.config import Config, AppConfig
-from loxmqttrelay.compatible._loxmqttrelay import MiniserverDataProcessor
+from loxmqttrelay.http_miniserver_handler import HttpMiniserverHandler, AdaptiveLimiter, _MSConfig
+from loxmqttrelay.config import Config, AppConfig, get_config
+from loxmqttrelay._loxmqttrelay import MiniserverDataProcessor
 import aiohttp
 import asyncio
 from typing import AsyncGenerator, Generator, List, Tuple, Any
@@ -13,9 +13,11 @@ async def mock_session() -> AsyncGenerator[MagicMock, None]:
     """
     Fixture that correctly patches aiohttp.ClientSession as an async context manager.
     """
-    with patch("aiohttp.ClientSession") as mock_client_session:
+    with patch("aiohttp.ClientSession") as mock_client_session, patch("aiohttp.TCPConnector"):
         # Create a MagicMock as "session object"
         mock_session_instance = MagicMock()
+        mock_session_instance.closed = False
+        mock_session_instance.close = AsyncMock()
 
         # Simulate context manager
         mock_session_instance.__aenter__.return_value = mock_session_instance
@@ -39,10 +41,10 @@ async def mock_session() -> AsyncGenerator[MagicMock, None]:
 
 @pytest.fixture(autouse=True)
 def cleanup_singletons() -> Generator[None, None, None]:
-    """Ensure Config singleton is cleaned up before and after each test"""
-    Config._instance = None
+    """Ensure the shared Config cache is cleaned up before and after each test"""
+    get_config.cache_clear()
     yield
-    Config._instance = None
+    get_config.cache_clear()
 
 @pytest.fixture
 def mock_config() -> AppConfig:
@@ -80,32 +82,58 @@ def handler() -> HttpMiniserverHandler:
     """Create handler instance"""
     return HttpMiniserverHandler()
 
+def ms_settings(**overrides: Any) -> _MSConfig:
+    """Miniserver settings for a handler, defaults to a real Miniserver on port 80"""
+    values = dict(
+        ip="192.168.1.1",
+        port=80,
+        user="user",
+        password="pass",
+        enable_mock=False,
+        mock_ip="",
+        mock_shortcircuit=False,
+        max_parallel_connections=5,
+    )
+    values.update(overrides)
+    return _MSConfig(**values)
+
 # HTTP Communication Tests
 @pytest.mark.asyncio
 async def test_http_authentication(
     mock_session: MagicMock,
-    handler: HttpMiniserverHandler,
     test_data: List[Tuple[str, Any]]
 ) -> None:
     """Test HTTP authentication with basic auth"""
-    handler.ms_user = "testuser"
-    handler.ms_pass = "testpass"
-    handler.ms_ip = "192.168.1.1"
-    # Update handler.auth and target_ip based on the new values
-    handler.auth = aiohttp.BasicAuth("testuser", "testpass")
-    handler.target_ip = "192.168.1.1"
-    # Update the http_base_url to use the correct IP
-    handler.http_base_url = f"http://{handler.target_ip}"
-    
+    handler = HttpMiniserverHandler(ms_settings(user="testuser", password="testpass"))
+    assert handler.auth == aiohttp.BasicAuth("testuser", "testpass")
+    assert handler.http_url_prefix == "http://192.168.1.1/dev/sps/io/"
+
     for topic, value in test_data:
         # Compute normalized topic manually (replace "/" with "_")
         normalized_topic = topic.replace('/', '_')
         await handler.send_to_miniserver_via_http(topic, normalized_topic, value)
 
-    mock_session.assert_called_with(
-        auth=aiohttp.BasicAuth("testuser", "testpass"),
-        timeout=aiohttp.ClientTimeout(total=10)
-    )
+    session_kwargs = mock_session.call_args.kwargs
+    assert session_kwargs["auth"] == aiohttp.BasicAuth("testuser", "testpass")
+    assert session_kwargs["timeout"] == aiohttp.ClientTimeout(total=10)
+
+
+@pytest.mark.asyncio
+async def test_http_session_reused(
+    mock_session: MagicMock,
+    handler: HttpMiniserverHandler,
+    test_data: List[Tuple[str, Any]]
+) -> None:
+    """Test that all HTTP sends share one ClientSession until the handler is closed"""
+    for topic, value in test_data:
+        await handler.send_to_miniserver_via_http(topic, topic.replace('/', '_'), value)
+
+    assert mock_session.call_count == 1
+    assert mock_session.return_value.get.call_count == len(test_data)
+
+    await handler.close()
+    mock_session.return_value.close.assert_awaited_once()
+    assert handler._session is None
 
 @pytest.mark.asyncio
 async def test_http_topic_normalization(
@@ -156,27 +184,30 @@ async def test_http_parallel_connections(mock_session: MagicMock, handler: HttpM
         for i in range(10)
     ]
     
-    handler.connection_semaphore = asyncio.Semaphore(5)
-    for topic, value in test_data:
-        normalized_topic = topic.replace('/', '_')
-        await handler.send_to_miniserver_via_http(topic, normalized_topic, value)
-    
+    handler.max_parallel_connections = 5
+    with patch("aiohttp.TCPConnector") as mock_connector:
+        for topic, value in test_data:
+            normalized_topic = topic.replace('/', '_')
+            await handler.send_to_miniserver_via_http(topic, normalized_topic, value)
+
+    # Concurrency is capped by the shared connector
+    mock_connector.assert_called_once()
+    assert mock_connector.call_args.kwargs["limit"] == 5
+    assert mock_connector.call_args.kwargs["limit_per_host"] == 5
     assert mock_session.return_value.__aenter__.return_value.get.call_count == 10
 
 # Mock Server Tests
 @pytest.mark.asyncio
 async def test_mock_server_http(
     mock_session: MagicMock,
-    handler: HttpMiniserverHandler,
     test_data: List[Tuple[str, Any]]
 ) -> None:
     """Test mock server in HTTP mode"""
-    handler.enable_mock_miniserver = True
-    handler.mock_ms_ip = "192.168.1.2"
-    handler.target_ip = handler.mock_ms_ip
-    # Update the http_base_url to use the mock IP
-    handler.http_base_url = f"http://{handler.mock_ms_ip}"
-    
+    handler = HttpMiniserverHandler(ms_settings(enable_mock=True, mock_ip="192.168.1.2"))
+    assert handler.target_ip == "192.168.1.2"
+    assert handler.http_url_prefix == "http://192.168.1.2/dev/sps/io/"
+    assert not handler.skip_network
+
     for topic, value in test_data:
         normalized_topic = topic.replace('/', '_')
         await handler.send_to_miniserver_via_http(topic, normalized_topic, value)
@@ -185,143 +216,359 @@ async def test_mock_server_http(
     first_topic, first_value = test_data[0]  # type: ignore
     normalized_topic = first_topic.replace('/', '_')
     mock_session.return_value.__aenter__.return_value.get.assert_any_call(
-        f"http://{handler.mock_ms_ip}/dev/sps/io/{normalized_topic}/{first_value}"
+        f"http://192.168.1.2/dev/sps/io/{normalized_topic}/{first_value}"
     )
 
-# Custom Port Tests
+
 @pytest.mark.asyncio
-async def test_http_custom_port_usage(
-    mock_session: MagicMock,
-    config_instance: Config,
-    handler: HttpMiniserverHandler
-) -> None:
+async def test_http_custom_port_usage(mock_session: MagicMock) -> None:
     """Test that custom configured miniserver port is used in HTTP requests"""
-    # Configure custom port
-    custom_port = 8080
-    config_instance._config.miniserver.miniserver_port = custom_port
-    
-    # Update handler with custom port configuration
-    handler.ms_port = custom_port
-    handler.ms_ip = "192.168.1.1"
-    handler.target_ip = handler.ms_ip
-    handler.enable_mock_miniserver = False
-    # Update the http_base_url to use the custom port configuration
-    handler.http_base_url = f"http://{handler.target_ip}:{custom_port}"
-    
+    handler = HttpMiniserverHandler(ms_settings(port=8080))
+    assert handler.http_url_prefix == "http://192.168.1.1:8080/dev/sps/io/"
+
     test_topic = "test/topic"
     test_value = "test_value"
     normalized_topic = test_topic.replace('/', '_')
-    
+
     await handler.send_to_miniserver_via_http(test_topic, normalized_topic, test_value)
-    
+
     # Verify that the custom port is included in the URL
-    expected_url = f"http://{handler.target_ip}:{custom_port}/dev/sps/io/{normalized_topic}/{test_value}"
+    expected_url = f"http://192.168.1.1:8080/dev/sps/io/{normalized_topic}/{test_value}"
     mock_session.return_value.__aenter__.return_value.get.assert_called_with(expected_url)
 
+
 @pytest.mark.asyncio
-async def test_websocket_custom_port_usage(
-    config_instance: Config,
-    handler: HttpMiniserverHandler
-) -> None:
+async def test_websocket_custom_port_usage() -> None:
     """Test that custom configured miniserver port is used in WebSocket URL construction"""
-    # Configure custom port
-    custom_port = 8443
-    config_instance._config.miniserver.miniserver_port = custom_port
-    
-    # Update handler with custom port configuration
-    handler.ms_port = custom_port
-    handler.ms_ip = "192.168.1.1"
-    handler.target_ip = handler.ms_ip
-    handler.enable_mock_miniserver = False
-    
-    # Test WebSocket URL construction
-    expected_protocol = "https" if custom_port == 443 else "http"
-    expected_ws_base_url = f"{expected_protocol}://{handler.target_ip}:{custom_port}"
-    
-    # Create a new ws_base_url with the custom port
-    handler.ws_base_url = f"{expected_protocol}://{handler.target_ip}:{custom_port}"
-    
-    # Verify the URL includes the custom port
-    assert str(custom_port) in handler.ws_base_url
-    assert handler.ws_base_url == expected_ws_base_url
+    handler = HttpMiniserverHandler(ms_settings(port=8443))
+    assert handler.ws_base_url == "http://192.168.1.1:8443"
 
-@pytest.mark.asyncio  
-async def test_websocket_url_construction_with_custom_port(
-    config_instance: Config,
-    handler: HttpMiniserverHandler
-) -> None:
+
+@pytest.mark.asyncio
+async def test_websocket_url_construction_with_custom_port() -> None:
     """Test WebSocket URL is properly constructed with custom port"""
-    # Test different custom ports
     test_cases = [
-        (8080, "http"),
-        (9443, "http"),
-        (443, "https"),
-        (8443, "http")
+        (8080, "http://192.168.1.1:8080"),
+        (9443, "http://192.168.1.1:9443"),
+        (443, "https://192.168.1.1"),
+        (8443, "http://192.168.1.1:8443")
     ]
-    
-    for custom_port, expected_protocol in test_cases:
-        # Configure custom port
-        config_instance._config.miniserver.miniserver_port = custom_port
-        
-        # Update handler with custom port configuration  
-        handler.ms_port = custom_port
-        handler.ms_ip = "192.168.1.1"
-        handler.target_ip = handler.ms_ip
-        handler.enable_mock_miniserver = False
-        
-        # Construct WebSocket URL with proper port handling
-        protocol = "https" if custom_port == 443 else "http"
-        if custom_port not in [80, 443]:
-            expected_ws_base_url = f"{protocol}://{handler.target_ip}:{custom_port}"
-        else:
-            expected_ws_base_url = f"{protocol}://{handler.target_ip}"
-        
-        # Update handler's ws_base_url using the same logic as the fixed implementation
-        handler.ws_base_url = expected_ws_base_url
-        
-        # Verify the URL construction is correct
-        if custom_port not in [80, 443]:
-            assert str(custom_port) in handler.ws_base_url
-        assert expected_protocol in handler.ws_base_url
-        assert handler.target_ip in handler.ws_base_url
+
+    for custom_port, expected_ws_base_url in test_cases:
+        handler = HttpMiniserverHandler(ms_settings(port=custom_port))
         assert handler.ws_base_url == expected_ws_base_url
+        assert handler.http_url_prefix == f"{expected_ws_base_url}/dev/sps/io/"
+
 
 @pytest.mark.asyncio
-async def test_standard_ports_behavior(
-    mock_session: MagicMock,
-    config_instance: Config, 
-    handler: HttpMiniserverHandler
-) -> None:
-    """Test behavior with standard ports (80 for HTTP, 443 for HTTPS)"""
+@pytest.mark.parametrize("verify_ssl", [False, True])
+async def test_https_port_and_certificate_verification(mock_session: MagicMock, verify_ssl: bool) -> None:
+    """Test that port 443 uses https and the connector verifies the certificate only when configured"""
+    handler = HttpMiniserverHandler(ms_settings(port=443, verify_ssl=verify_ssl))
+    assert handler.http_url_prefix == "https://192.168.1.1/dev/sps/io/"
+
+    with patch("aiohttp.TCPConnector") as mock_connector:
+        await handler.send_to_miniserver_via_http("test/topic", "test_topic", 1)
+
+    assert mock_connector.call_args.kwargs["ssl"] is verify_ssl
+    mock_session.return_value.__aenter__.return_value.get.assert_called_with("https://192.168.1.1/dev/sps/io/test_topic/1")
+
+@pytest.mark.asyncio
+async def test_standard_ports_behavior(mock_session: MagicMock) -> None:
+    """Test behavior with standard ports (80 for HTTP, 443 for HTTPS), which are left out of the URL"""
     test_cases = [
-        (80, "http"),
-        (443, "https")
+        (80, "http://192.168.1.1"),
+        (443, "https://192.168.1.1")
     ]
-    
-    for port, expected_protocol in test_cases:
-        # Configure port
-        config_instance._config.miniserver.miniserver_port = port
-        handler.ms_port = port
-        handler.ms_ip = "192.168.1.1"
-        handler.target_ip = handler.ms_ip
-        handler.enable_mock_miniserver = False
-        
-        # Test WebSocket URL construction
-        expected_ws_base_url = f"{expected_protocol}://{handler.target_ip}"
-        if port not in [80, 443]:  # Only add port if not standard
-            expected_ws_base_url += f":{port}"
-            
-        handler.ws_base_url = f"{expected_protocol}://{handler.target_ip}"
-        # Update http_base_url for HTTP requests
-        handler.http_base_url = f"http://{handler.target_ip}"
-        
-        # For HTTP requests, standard ports should still work
-        test_topic = "test/topic"
-        test_value = "test_value"  
-        normalized_topic = test_topic.replace('/', '_')
-        
-        await handler.send_to_miniserver_via_http(test_topic, normalized_topic, test_value)
-        
-        # The current implementation might not include standard ports
-        # This test documents the current behavior
-        mock_session.return_value.__aenter__.return_value.get.assert_called()
+
+    for port, expected_base_url in test_cases:
+        handler = HttpMiniserverHandler(ms_settings(port=port))
+        assert handler.ws_base_url == expected_base_url
+        assert handler.http_url_prefix == f"{expected_base_url}/dev/sps/io/"
+
+        await handler.send_to_miniserver_via_http("test/topic", "test_topic", "test_value")
+        mock_session.return_value.__aenter__.return_value.get.assert_called_with(
+            f"{expected_base_url}/dev/sps/io/test_topic/test_value"
+        )
+
+
+@pytest.mark.asyncio
+async def test_send_to_miniserver_batching(handler: HttpMiniserverHandler) -> None:
+    """Test that queued sends are coalesced into one batch once batching is started"""
+    with patch.object(handler, "send_batch_to_miniserver", new_callable=AsyncMock) as mock_batch:
+        handler.start_batching()
+        try:
+            for i in range(3):
+                await handler.send_to_miniserver(f"test/topic{i}", f"test_topic{i}", i)
+            await asyncio.sleep(handler.batch_window * 4)
+        finally:
+            await handler.close()
+
+    mock_batch.assert_awaited_once_with([
+        ("test/topic0", "test_topic0", 0),
+        ("test/topic1", "test_topic1", 1),
+        ("test/topic2", "test_topic2", 2),
+    ])
+
+@pytest.mark.asyncio
+async def test_send_to_miniserver_drops_when_queue_full(handler: HttpMiniserverHandler) -> None:
+    """Test that sends beyond the queue size are dropped instead of growing the queue without bound"""
+    handler.queue_size = 2
+    with patch.object(handler, "send_batch_to_miniserver", new_callable=AsyncMock) as mock_batch:
+        handler.start_batching()
+        try:
+            # No await in between, the drain loop cannot empty the queue
+            for i in range(3):
+                await handler.send_to_miniserver(f"test/topic{i}", f"test_topic{i}", i)
+            assert handler._queue.qsize() == 2
+        finally:
+            await handler.close()
+
+    mock_batch.assert_awaited_once_with([
+        ("test/topic0", "test_topic0", 0),
+        ("test/topic1", "test_topic1", 1),
+    ])
+
+@pytest.mark.asyncio
+async def test_send_many_uses_bounded_queue(handler: HttpMiniserverHandler) -> None:
+    """Test that multi-value sends share the bounded queue and are flushed on close"""
+    handler.queue_size = 2
+    with patch.object(handler, "send_batch_to_miniserver", new_callable=AsyncMock) as mock_batch:
+        handler.start_batching()
+        try:
+            await handler.send_to_miniserver("test/topic0", "test_topic0", 0)
+            await handler.send_many_to_miniserver([
+                ("json/topic/a", "json_topic_a", 1),
+                ("json/topic/b", "json_topic_b", 2),
+            ])
+            assert handler._queue.qsize() == 2
+        finally:
+            await handler.close()
+
+    mock_batch.assert_awaited_once_with([
+        ("test/topic0", "test_topic0", 0),
+        ("json/topic/a", "json_topic_a", 1),
+    ])
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_backoff_and_recovery() -> None:
+    """Test that the adaptive limiter halves on failures and recovers up to its maximum"""
+    limiter = AdaptiveLimiter(max_limit=8)
+    assert limiter.limit == 8
+
+    async with limiter.use() as sample:
+        sample.drop()
+    assert limiter.limit == 4
+
+    with pytest.raises(aiohttp.ClientError):
+        async with limiter.use():
+            raise aiohttp.ClientError("boom")
+    assert limiter.limit == 2
+
+    for _ in range(10):
+        async with limiter.use():
+            pass
+    assert limiter.limit == 8
+    assert limiter._in_flight == 0
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_ignores_cancelled_requests() -> None:
+    """Test that a cancelled request neither shrinks the limit nor becomes the minimum RTT"""
+    limiter = AdaptiveLimiter(max_limit=8)
+    limiter.limit = 4
+
+    with pytest.raises(asyncio.CancelledError):
+        async with limiter.use():
+            raise asyncio.CancelledError()
+
+    assert limiter.limit == 4
+    assert limiter._rtt_min == float("inf")
+    assert limiter._in_flight == 0
+
+@pytest.mark.asyncio
+async def test_websocket_reconnect_with_backoff(handler: HttpMiniserverHandler) -> None:
+    """Test that a failed WebSocket connect is retried with backoff before sending"""
+    ws_client = MagicMock()
+    ws_client.state = "IDLE"
+
+    async def connect(**kwargs):
+        if ws_client.connect.await_count < 3:
+            raise OSError("Miniserver unreachable")
+        ws_client.state = "CONNECTED"
+
+    ws_client.connect = AsyncMock(side_effect=connect)
+    ws_client.send_websocket_command = AsyncMock()
+    handler.reconnect_base_delay = 0.001
+
+    with patch("loxmqttrelay.http_miniserver_handler.loxwebsocket", ws_client):
+        await handler.send_to_minisever_via_websocket("test/topic", "test_topic", 1)
+
+    assert ws_client.connect.await_count == 3
+    assert handler._reconnect_attempts == 0
+    ws_client.send_websocket_command.assert_awaited_once_with("test_topic", "1")
+
+@pytest.mark.asyncio
+async def test_websocket_reconnect_gives_up(handler: HttpMiniserverHandler) -> None:
+    """Test that an unreachable Miniserver is answered with 503 instead of blocking the send"""
+    ws_client = MagicMock()
+    ws_client.state = "IDLE"
+    ws_client.connect = AsyncMock(side_effect=OSError("Miniserver unreachable"))
+    ws_client.send_websocket_command = AsyncMock()
+    handler.reconnect_base_delay = 0.01
+    handler.reconnect_give_up_after = 0.05
+
+    with patch("loxmqttrelay.http_miniserver_handler.loxwebsocket", ws_client):
+        assert await handler.send_to_minisever_via_websocket("test/topic", "test_topic", 1) == 503
+
+    assert ws_client.connect.await_count >= 1
+    ws_client.send_websocket_command.assert_not_awaited()
+    # Backoff starts over for the next outage
+    assert handler._reconnect_attempts == 0
+
+@pytest.mark.asyncio
+async def test_websocket_queued_senders_share_connect_outcome(handler: HttpMiniserverHandler) -> None:
+    """Test that senders waiting on the connect lock reuse the connection or give-up of the sender holding it"""
+    ws_client = MagicMock()
+    ws_client.state = "IDLE"
+
+    async def unreachable(**kwargs):
+        await asyncio.sleep(0.01)
+        raise OSError("Miniserver unreachable")
+
+    ws_client.connect = AsyncMock(side_effect=unreachable)
+    ws_client.send_websocket_command = AsyncMock()
+    handler.reconnect_give_up_after = 0
+
+    with patch("loxmqttrelay.http_miniserver_handler.loxwebsocket", ws_client):
+        codes = await asyncio.gather(*(handler.send_to_minisever_via_websocket("test/topic", "test_topic", i) for i in range(3)))
+        assert codes == [503, 503, 503]
+        assert ws_client.connect.await_count == 1
+
+        async def connect(**kwargs):
+            await asyncio.sleep(0.01)
+            ws_client.state = "CONNECTED"
+
+        ws_client.connect = AsyncMock(side_effect=connect)
+        codes = await asyncio.gather(*(handler.send_to_minisever_via_websocket("test/topic", "test_topic", i) for i in range(3)))
+        assert codes == [200, 200, 200]
+        assert ws_client.connect.await_count == 1
+
+@pytest.mark.asyncio
+async def test_websocket_structured_value_sent_as_json(handler: HttpMiniserverHandler) -> None:
+    """Test that dict/list values are serialized as JSON for the WebSocket command"""
+    ws_client = MagicMock()
+    ws_client.state = "CONNECTED"
+    ws_client.send_websocket_command = AsyncMock()
+
+    with patch("loxmqttrelay.http_miniserver_handler.loxwebsocket", ws_client):
+        await handler.send_to_minisever_via_websocket("test/topic", "test_topic", {"a": [1, True]})
+
+    ws_client.send_websocket_command.assert_awaited_once_with("test_topic", '{"a":[1,true]}')
+
+@pytest.mark.asyncio
+async def test_send_batch_returns_status_codes(handler: HttpMiniserverHandler) -> None:
+    """Test that a batch returns (topic, status code) pairs in input order"""
+    async def fake_send(topic, normalized_topic, value):
+        if value == "boom":
+            raise RuntimeError("boom")
+        return 200 if value == "ok" else 408
+
+    with patch.object(handler, "_send", side_effect=fake_send):
+        results = await handler.send_batch_to_miniserver([
+            ("a/topic", "a_topic", "ok"),
+            ("b/topic", "b_topic", "slow"),
+            ("c/topic", "c_topic", "boom"),
+        ])
+
+    assert results == [("a/topic", 200), ("b/topic", 408), ("c/topic", 500)]
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending_batches(handler: HttpMiniserverHandler) -> None:
+    """Test that closing the handler sends queued messages instead of dropping them"""
+    handler.batch_window = 10  # Longer than the test, close() has to flush
+    with patch.object(handler, "_send", new_callable=AsyncMock, return_value=200) as mock_send:
+        handler.start_batching()
+        await handler.send_to_miniserver("test/topic1", "test_topic1", 1)
+        await asyncio.sleep(0)  # Let the drain loop pick up the first message
+        await handler.send_to_miniserver("test/topic2", "test_topic2", 2)
+        await handler.close()
+
+    sent = sorted(call.args for call in mock_send.await_args_list)
+    assert sent == [("test/topic1", "test_topic1", 1), ("test/topic2", "test_topic2", 2)]
+    assert not handler._batch_tasks
+
+@pytest.mark.asyncio
+async def test_close_cancels_stuck_batches(handler: HttpMiniserverHandler) -> None:
+    """Test that close() cancels batches that do not finish within close_timeout"""
+    handler.close_timeout = 0.01
+
+    async def stuck_send(topic, normalized_topic, value):
+        await asyncio.Event().wait()
+
+    with patch.object(handler, "_send", side_effect=stuck_send):
+        handler.start_batching()
+        await handler.send_to_miniserver("test/topic", "test_topic", 1)
+        await asyncio.wait_for(handler.close(), timeout=1)
+
+    assert not handler._batch_tasks
+
+def test_batch_tasks_not_shared_between_handlers() -> None:
+    """Test that every handler tracks its own batch tasks"""
+    assert HttpMiniserverHandler()._batch_tasks is not HttpMiniserverHandler()._batch_tasks
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error,expected_code", [
+    (asyncio.TimeoutError(), 408),
+    (aiohttp.ClientOSError(), 503),
+    (OSError("unreachable"), 503),
+    (aiohttp.ClientPayloadError("broken"), 500),
+    (ValueError("unexpected"), 500),
+])
+async def test_http_error_codes(
+    mock_session: MagicMock,
+    handler: HttpMiniserverHandler,
+    error: Exception,
+    expected_code: int
+) -> None:
+    """Test that failed HTTP sends are mapped to their status code"""
+    mock_session.return_value.get = MagicMock(side_effect=error)
+    assert await handler.send_to_miniserver_via_http("test/topic", "test_topic", 1) == expected_code
+
+@pytest.mark.asyncio
+async def test_http_cancellation_propagates(mock_session: MagicMock, handler: HttpMiniserverHandler) -> None:
+    """Test that a cancelled HTTP send is re-raised instead of being turned into a status code"""
+    mock_session.return_value.get = MagicMock(side_effect=asyncio.CancelledError())
+    with patch("loxmqttrelay.http_miniserver_handler.logger") as mock_logger:
+        with pytest.raises(asyncio.CancelledError):
+            await handler.send_to_miniserver_via_http("test/topic", "test_topic", 1)
+    # Cancellation is part of shutdown, not an error
+    mock_logger.error.assert_not_called()
+
+def test_settings_resolved_once(config_instance: Config) -> None:
+    """Test that the handler derives its URLs and auth from the frozen Miniserver settings"""
+    config_instance._config.miniserver.miniserver_port = 8080
+    config_instance._config.debug.mock_ip = "192.168.1.2"
+    config_instance._config.debug.enable_mock = True
+    settings = _MSConfig.from_config(config_instance)
+
+    handler = HttpMiniserverHandler(settings)
+    assert handler.target_ip == "192.168.1.2"
+    assert handler.target_label == "(mock)"
+    assert handler.ws_base_url == "http://192.168.1.2:8080"
+    assert handler.http_url_prefix == "http://192.168.1.2:8080/dev/sps/io/"
+    assert handler.auth == aiohttp.BasicAuth("user", "pass")
+
+    with pytest.raises(AttributeError):
+        settings.port = 443  # type: ignore[misc]
+
+@pytest.mark.asyncio
+async def test_mock_shortcircuit_skips_network(mock_session: MagicMock, config_instance: Config) -> None:
+    """Test that mock short-circuit acknowledges sends without touching the network"""
+    config_instance._config.debug.mock_ip = "192.168.1.2"
+    config_instance._config.debug.enable_mock = True
+    config_instance._config.debug.mock_shortcircuit = True
+    handler = HttpMiniserverHandler(_MSConfig.from_config(config_instance))
+
+    await handler.send_to_miniserver("test/topic", "test_topic", 1)
+    assert await handler.send_batch_to_miniserver([("test/topic", "test_topic", 1)]) == [("test/topic", 200)]
+    mock_session.assert_not_called()
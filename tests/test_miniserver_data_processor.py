@@ -4,7 +4,7 @@ import json
 from unittest.mock import AsyncMock, patch, MagicMock
 from loxmqttrelay.config import Config, AppConfig, global_config
 import asyncio
-from loxmqttrelay.compatible._loxmqttrelay import MiniserverDataProcessor  # Assuming 'librs' is the compiled Rust module
+from loxmqttrelay._loxmqttrelay import MiniserverDataProcessor  # Assuming 'librs' is the compiled Rust module
 
 TOPIC = 'mock/topic'  # Define a mock or placeholder for the TOPIC variable
 
@@ -106,6 +106,9 @@ async def processor(config_instance):
     ("disable", "0"),
     ("0", "0"),
     ("invalid", "invalid"),
+    (" On ", "1"),
+    ("SELECTED", "1"),
+    ("true but longer", "true but longer"),
     ("", ""),
     (None, "")
 ])
@@ -149,15 +152,20 @@ def test_normalize_topic(processor):
 
 def test_expand_json(processor):
     result = processor.expand_json("test", '{"key1": "val1", "key2": {"nested": "val2"}}')
-    expected = {
+    expected = [
         ("test/key1", "val1"),
         ("test/key2/nested", "val2")
-    }
+    ]
     assert result == expected
 
     # Test with non-JSON value
     result = processor.expand_json("test", "normal_value")
-    assert result == {("test", "normal_value")}
+    assert result == [("test", "normal_value")]
+
+    # Only objects are flattened, leading whitespace is allowed
+    assert processor.expand_json("test", ' \n{"key": 1}') == [("test/key", "1")]
+    assert processor.expand_json("test", "[1, 2]") == [("test", "[1, 2]")]
+    assert processor.expand_json("test", "21.5") == [("test", "21.5")]
 
 
 def test_cache_behavior(processor):
@@ -180,11 +188,26 @@ def test_update_topic_whitelist(processor):
     processor.update_topic_whitelist(whitelist)
     assert processor.topic_whitelist == set(whitelist)
 
+def test_whitelist_stored_normalized(processor):
+    processor.update_topic_whitelist(["some/allowed%topic", "already_normalized"])
+    assert processor.topic_whitelist == {"some_allowed_topic", "already_normalized"}
+    assert processor.is_in_whitelist("some/allowed/topic")
+    assert processor.is_in_whitelist("already_normalized")
+    assert processor.is_in_whitelist("already/normalized")
+    assert not processor.is_in_whitelist("other/topic")
+
 def test_update_do_not_forward(processor):
     do_not_forward = [r"^debug_.*", r"private_topic"]
     processor.update_do_not_forward(do_not_forward)
     assert processor.get_do_not_forward_patterns is not None
 
+def test_filter_getters_return_valid_patterns(processor):
+    """Invalid filters are dropped, valid ones are returned unchanged even if they contain '|'."""
+    processor.update_subscription_filters([r"^a\/(b|c)$", r"(invalid"])
+    processor.update_do_not_forward([r"^debug\/.*"])
+    assert processor.get_subscription_filters() == [r"^a\/(b|c)$"]
+    assert processor.get_do_not_forward_patterns() == [r"^debug\/.*"]
+
 @pytest.mark.parametrize("filters,topic,message,should_stay", [
     ([r"^ignore\/.*"], "ignore/something", "value", False),
     ([r"^ignore\/.*"], "normal/topic", "value", True),
@@ -208,6 +231,7 @@ async def test_process_data_filter_second_pass_after_flatten(processor, monkeypa
 
     processor.update_subscription_filters([r"ignore\/.*"])
     monkeypatch.setattr(global_config.processing, 'expand_json', True)
+    processor.reload_config()
 
     processor.process_data(topic, message)
     calls = processor.http_handler_obj.send_to_miniserver.call_args_list
@@ -216,6 +240,41 @@ async def test_process_data_filter_second_pass_after_flatten(processor, monkeypa
     assert "original/topic/ignore/nested" not in processed_topics
     assert "original/topic/key1" in processed_topics
 
+@pytest.mark.asyncio
+async def test_process_data_flattened_json_sent_as_one_batch(processor, monkeypatch):
+    """Flattened JSON values are handed to the handler in one batch call."""
+    monkeypatch.setattr(global_config.processing, 'expand_json', True)
+    processor.reload_config()
+
+    processor.process_data("json/topic", '{"a": "on", "b": {"c": 2}}')
+
+    processor.http_handler_obj.send_to_miniserver.assert_not_called()
+    processor.http_handler_obj.send_many_to_miniserver.assert_called_once_with([
+        ("json/topic/a", "json_topic_a", "1"),
+        ("json/topic/b/c", "json_topic_b_c", "2"),
+    ])
+
+@pytest.mark.asyncio
+async def test_config_update_via_mqtt_reloads_expand_json(config_instance):
+    """A config/set message refreshes the cached expand_json flag before the restart."""
+    class TopicNS(DummyTopicNS):
+        CONFIG_SET = "myrelay/config/set"
+
+    def update_fields(updates, list_mode):
+        for field_name, value in updates.items():
+            setattr(config_instance.processing, field_name, value)
+
+    relay = MagicMock()
+    relay.miniserver_data_processor.global_config.update_fields.side_effect = update_fields
+    http_handler = MagicMock()
+    processor = MiniserverDataProcessor(TopicNS(), config_instance, relay, MagicMock(), http_handler, json)
+
+    processor.handle_mqtt_message("myrelay/config/set", b'{"expand_json": true}')
+    relay.restart_relay_incl_ui.assert_called_once()
+
+    processor.process_data("json/topic", '{"a": 1, "b": 2}')
+    http_handler.send_many_to_miniserver.assert_called_once()
+
 @pytest.mark.asyncio
 async def test_process_data_with_whitelist(processor):
     # Test non-whitelisted case
@@ -271,6 +330,7 @@ async def test_process_data_order_of_filters(processor, monkeypatch):
     processor.update_topic_whitelist(["whitelisted_foo", "normal_publish"])
     processor.update_do_not_forward([r"^dnf\/.*"])
     monkeypatch.setattr(global_config.processing, 'expand_json', True)
+    processor.reload_config()
 
     for topic, message in topic_messages:
         processor.process_data(topic, message)
@@ -4,6 +4,9 @@ from io import BytesIO
 import struct
 import zlib
 import zipfile
+import ftplib
+import lz4.block
+import lz4.frame
 from loxmqttrelay.miniserver_sync import (
     load_miniserver_config,
     extract_inputs,
@@ -77,6 +80,42 @@ def test_load_miniserver_config_no_files(mock_ftp):
     with pytest.raises(Exception, match="No configuration files found"):
         load_miniserver_config("192.168.1.1", "user", "pass")
 
+@pytest.mark.parametrize("compress", [
+    lambda data: lz4.block.compress(data, store_size=False),
+    lz4.frame.compress,
+], ids=["block", "frame"])
+@pytest.mark.parametrize("zip_compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED], ids=["stored", "deflated"])
+def test_load_miniserver_config_downloads_and_decompresses(mock_ftp, compress, zip_compression):
+    xml = b'<?xml version="1.0" encoding="utf-8"?><C><C Type="VirtualInCaption"><C Title="Input1"/></C></C>'
+    compressed = compress(xml)
+    loxcc = struct.pack('<LLLL', 0xaabbccee, len(compressed), len(xml), zlib.crc32(xml)) + compressed
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, 'w', compression=zip_compression) as zf:
+        zf.writestr('readme.txt', b'not the config')
+        zf.writestr('sps0.LoxCC', loxcc)
+    archive = archive.getvalue()
+
+    def retrbinary(cmd, callback, blocksize=8192):
+        for i in range(0, len(archive), blocksize):
+            callback(archive[i:i + blocksize])
+
+    mock_ftp.nlst.return_value = ["sps_1_20240101.zip", "sps_2_20240102.zip", "readme.txt"]
+    mock_ftp.size.return_value = len(archive)
+    mock_ftp.retrbinary.side_effect = retrbinary
+
+    assert load_miniserver_config("192.168.1.1", "user", "pass") == xml
+    mock_ftp.size.assert_called_once_with("/prog/sps_2_20240102.zip")
+    assert mock_ftp.retrbinary.call_args.args[0] == "RETR /prog/sps_2_20240102.zip"
+
+    # Servers without SIZE support fall back to a growing buffer
+    mock_ftp.size.side_effect = ftplib.error_perm("500 SIZE not understood")
+    assert load_miniserver_config("192.168.1.1", "user", "pass") == xml
+
+    # Stored members are sliced out of the download without zipfile
+    if zip_compression == zipfile.ZIP_STORED:
+        with patch('loxmqttrelay.miniserver_sync.zipfile.ZipFile', side_effect=AssertionError):
+            assert load_miniserver_config("192.168.1.1", "user", "pass") == xml
+
 def test_load_miniserver_config_ftp_error(mock_ftp):
     mock_ftp.login.side_effect = Exception("FTP Error")
     with pytest.raises(Exception):
@@ -186,3 +225,37 @@ def test_extract_inputs_with_bom():
     xml_with_bom = b'\xef\xbb\xbf<?xml version="1.0" encoding="utf-8"?>\n<C><C Type="VirtualInCaption"><C Title="InputWithBOM"/></C></C>'
     inputs = extract_inputs(xml_with_bom)
     assert inputs == ["InputWithBOM"]
+
+def test_extract_inputs_nested_captions_listed_once():
+    nested_xml = b'''<?xml version="1.0" encoding="utf-8"?>
+    <C>
+        <C Type="VirtualInCaption">
+            <C Title="Input1"/>
+            <C Type="VirtualInCaption">
+                <C Title="Input2"/>
+            </C>
+            <C Title=""/>
+        </C>
+        <C Title="NotAnInput"/>
+    </C>'''
+    assert extract_inputs(nested_xml) == ["Input1", "Input2"]
+
+def test_extract_inputs_recovery_nested_captions_listed_once():
+    malformed_xml = b'''<?xml version="1.0" encoding="utf-8"?>
+    <C>
+        <C Type="VirtualInCaption" Type="Duplicate">
+            <C Title="Input1"/>
+            <C Type="VirtualInCaption">
+                <C Title="Input2"/>
+            </C>
+        </C>
+    </C>'''
+    assert extract_inputs(malformed_xml) == ["Input1", "Input2"]
+
+def test_extract_inputs_with_leading_comment():
+    xml = b'<!-- hi --><?pi data?><C Type="LoxLIVE"><C Type="VirtualInCaption"><C Title="a"/></C></C>'
+    assert extract_inputs(xml) == ["a"]
+
+def test_extract_inputs_accepts_buffers(sample_config_xml):
+    assert set(extract_inputs(bytearray(sample_config_xml))) == {"Input1", "Input2", "Input3"}
+    assert set(extract_inputs(memoryview(sample_config_xml))) == {"Input1", "Input2", "Input3"}
@@ -3,7 +3,7 @@ import pytest_asyncio
 import asyncio
 import logging
 from unittest.mock import AsyncMock, MagicMock, patch, call
-from loxmqttrelay.mqtt_client import MQTTClient
+from loxmqttrelay.mqtt_client import MQTTClient, get_mqtt_client
 from loxmqttrelay.config import (
     Config, BrokerConfig, AppConfig,
     GeneralConfig, global_config
@@ -92,7 +92,8 @@ async def test_connect(mock_client, mqtt_client):
         port=1883,
         version=4
     )
-    mock_client.subscribe.assert_called_with(test_topics[0])
+    mock_client.subscribe.assert_called_once()
+    assert [s.topic for s in mock_client.subscribe.call_args.args[0]] == test_topics
     mock_client.publish.assert_called_with(
         "test/topic/status",
         "Connected"
@@ -100,6 +101,25 @@ async def test_connect(mock_client, mqtt_client):
 
     await mqtt_client.disconnect()
 
+@pytest.mark.asyncio
+async def test_subscribe_after_connect(mock_client, mqtt_client):
+    """Test that topics can be subscribed after connecting and are kept for reconnects"""
+    test_topics = ["test/topic1", "test/topic2"]
+
+    await mqtt_client.connect([], AsyncMock())
+    mock_client.subscribe.assert_not_called()
+
+    mqtt_client.subscribe(test_topics)
+    mock_client.subscribe.assert_called_once()
+    assert [s.topic for s in mock_client.subscribe.call_args.args[0]] == test_topics
+
+    # A reconnect subscribes the same topics again
+    mqtt_client._on_connect(None, None, None, None)
+    assert mock_client.subscribe.call_count == 2
+    assert [s.topic for s in mock_client.subscribe.call_args.args[0]] == test_topics
+
+    await mqtt_client.disconnect()
+
 @pytest.mark.asyncio
 async def test_disconnect(mock_client, mqtt_client):
     """Test proper disconnection and cleanup"""
@@ -123,9 +143,9 @@ async def test_subscribe_topics(mock_client, mqtt_client):
 
     await mqtt_client.connect(test_topics, callback)
 
-    assert mock_client.subscribe.call_count == len(test_topics)
-    for topic in test_topics:
-        mock_client.subscribe.assert_any_call(topic)
+    # All topics go out in a single SUBSCRIBE
+    mock_client.subscribe.assert_called_once()
+    assert [s.topic for s in mock_client.subscribe.call_args.args[0]] == test_topics
 
     await mqtt_client.disconnect()
 
@@ -446,3 +466,15 @@ class TestDownstreamBinaryDataFlow:
             received_data = call_args[0][1]
             assert received_data == binary_message
             assert len(received_data) == len(binary_message)
+
+def test_get_mqtt_client_is_lazy_singleton(mock_config, monkeypatch):
+    factory = MagicMock()
+    monkeypatch.setattr('loxmqttrelay.mqtt_client.Client', factory)
+    get_mqtt_client.cache_clear()
+    try:
+        factory.assert_not_called()
+        client = get_mqtt_client()
+        assert get_mqtt_client() is client
+        factory.assert_called_once()
+    finally:
+        get_mqtt_client.cache_clear()
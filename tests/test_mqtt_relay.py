@@ -1,11 +1,11 @@
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import logging
 import json
 from loxmqttrelay.main import MQTTRelay, TOPIC
 from loxmqttrelay.config import (
     Config, AppConfig, GeneralConfig,
-    TopicsConfig, MiniserverConfig, global_config
+    TopicsConfig, MiniserverConfig, ConfigError, global_config, get_config
 )
 import asyncio
 import typing
@@ -13,10 +13,10 @@ from typing import AsyncGenerator, Generator, List
 
 @pytest.fixture(autouse=True)
 def cleanup_singletons() -> typing.Generator[None, None, None]:
-    """Ensure Config singleton is cleaned up before and after each test"""
-    Config._instance = None
+    """Ensure the shared Config cache is cleaned up before and after each test"""
+    get_config.cache_clear()
     yield
-    Config._instance = None
+    get_config.cache_clear()
 
 @pytest.fixture
 def mock_config() -> typing.Generator[AppConfig, None, None]:
@@ -32,12 +32,10 @@ def mock_config() -> typing.Generator[AppConfig, None, None]:
 @pytest.fixture
 def config_instance(mock_config: AppConfig) -> typing.Generator[Config, None, None]:
     """Get a Config instance with mocked config"""
-    Config._instance = None  # Reset singleton
     config = Config()
     config._config = mock_config
     global_config._config = mock_config  # Ensure global_config uses the same mock
     yield config
-    Config._instance = None  # Reset singleton
 
 @pytest.fixture
 def mock_logger() -> typing.Generator[MagicMock, None, None]:
@@ -106,6 +104,7 @@ async def test_whitelist_sync_on_miniserver_startup(config_instance: Config, moc
     """Test: Bei miniserverevent/startup wird erneut gesynct."""
     with patch.object(config_instance, '_load_config', return_value=None):
         relay = MQTTRelay()
+        relay.sync_debounce_delay = 0.1
         with patch('loxmqttrelay.main.sync_miniserver_whitelist', return_value=["synced_topic1", "synced_topic2"]) as mock_sync:
             # Erstmalig syncen
             await relay.handle_miniserver_sync()
@@ -133,3 +132,82 @@ async def test_whitelist_sync_on_miniserver_startup(config_instance: Config, moc
 
             # Neue Whitelist sollte wieder "synced_topic1", "synced_topic2" enthalten
             assert global_config.topics.topic_whitelist == ["synced_topic1", "synced_topic2"]
+
+@pytest.mark.asyncio
+async def test_miniserver_startup_events_are_debounced(config_instance: Config, mock_logger: MagicMock) -> None:
+    """Test: Mehrere Startup-Events kurz hintereinander führen zu genau einem Sync."""
+    with patch.object(config_instance, '_load_config', return_value=None):
+        relay = MQTTRelay()
+        relay.sync_debounce_delay = 0.1
+        with patch('loxmqttrelay.main.sync_miniserver_whitelist', return_value=["synced_topic1"]) as mock_sync:
+            for _ in range(5):
+                relay.schedule_miniserver_sync()
+            await asyncio.sleep(0.3)
+
+            mock_sync.assert_called_once()
+            assert relay._pending_sync is None
+
+@pytest.mark.asyncio
+async def test_main_subscribes_after_sync(config_instance: Config, mock_logger: MagicMock) -> None:
+    """Test: Sync overlaps with the broker connect, subscriptions are only made once the whitelist is synced."""
+    relay = MQTTRelay()
+    order: List[str] = []
+    sync_release = asyncio.Event()
+
+    async def fake_sync() -> None:
+        order.append("sync started")
+        await sync_release.wait()
+        order.append("sync done")
+
+    async def fake_connect() -> None:
+        order.append("connect")
+        sync_release.set()
+
+    started = asyncio.Event()
+    with patch.object(relay, 'handle_miniserver_sync', side_effect=fake_sync), \
+         patch.object(relay, 'connect_mqtt', side_effect=fake_connect), \
+         patch.object(relay, 'subscribe_mqtt', side_effect=lambda: (order.append("subscribe"), started.set())), \
+         patch.object(relay, 'start_ui', new_callable=AsyncMock), \
+         patch('loxmqttrelay.main.start_udp_server', new_callable=AsyncMock), \
+         patch('loxmqttrelay.main.http_miniserver_handler') as mock_handler:
+        mock_handler.close = AsyncMock()
+        main_task = asyncio.create_task(relay.main())
+        await asyncio.wait_for(started.wait(), timeout=1)
+        main_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await main_task
+
+    # The sync only finishes once the connect released it, so both ran at the same time
+    assert order.index("connect") < order.index("sync done")
+    assert order[-2:] == ["sync done", "subscribe"]
+    mock_handler.close.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_main_closes_handler_on_connect_failure(config_instance: Config, mock_logger: MagicMock) -> None:
+    """Test: A failed broker connect cancels the pending sync and closes the handler."""
+    relay = MQTTRelay()
+    sync_cancelled = asyncio.Event()
+
+    async def fake_sync() -> None:
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            sync_cancelled.set()
+            raise
+
+    async def fake_connect() -> None:
+        await asyncio.sleep(0)
+        raise ConfigError("MQTT connection failed")
+
+    with patch.object(relay, 'handle_miniserver_sync', side_effect=fake_sync), \
+         patch.object(relay, 'connect_mqtt', side_effect=fake_connect), \
+         patch.object(relay, 'subscribe_mqtt') as mock_subscribe, \
+         patch('loxmqttrelay.main.http_miniserver_handler') as mock_handler:
+        mock_handler.close = AsyncMock()
+        with pytest.raises(ConfigError):
+            await relay.main()
+        await asyncio.wait_for(sync_cancelled.wait(), timeout=1)
+
+    mock_subscribe.assert_not_called()
+    mock_handler.start_batching.assert_called_once()
+    mock_handler.close.assert_awaited_once()
@@ -75,12 +75,44 @@ from loxmqttrelay.udp_handler import parse_udp_message, handle_udp_message, UDPP
 def test_parse_udp_message(udp_message, expected):
     result = parse_udp_message(udp_message)
     assert result == expected
+    # Raw datagram bytes parse the same way
+    assert parse_udp_message(udp_message.encode('utf-8')) == expected
+
+@pytest.mark.parametrize("udp_message,expected", [
+    (b"PuBlIsH topic message", ("publish", "topic", "message")),
+    (b"retain\ttopic message", ("retain", "topic", "message")),
+    (b"publisher topic message", ("publish", "publisher", "topic message")),
+    (b"retained topic", ("publish", "retained", "topic")),
+    (b"PUBLISH", None),
+    (b"retain   ", None),
+    (b"p@blish topic message", ("publish", "p@blish", "topic message")),
+])
+def test_parse_udp_message_command_detection(udp_message, expected):
+    assert parse_udp_message(udp_message) == expected
+
+@pytest.mark.parametrize("udp_message,expected", [
+    # A token without slash only joins the topic when sandwiched between slash tokens
+    ("a b c/d e", ("publish", "a", "b c/d e")),
+    ("a b/c d e/f g", ("publish", "a b/c d e/f", "g")),
+    ("a/b c d/e", ("publish", "a/b c", "d/e")),
+    ("a/b c d e/f", ("publish", "a/b", "c d e/f")),
+    # The last token always is payload
+    ("a/b c/d e/f", ("publish", "a/b c/d", "e/f")),
+])
+def test_parse_udp_message_topic_split(udp_message, expected):
+    assert parse_udp_message(udp_message) == expected
+
+def test_parse_udp_message_keeps_whitespace_inside_topic_and_payload():
+    assert parse_udp_message("a/b  c/d e\tf") == ("publish", "a/b  c/d", "e\tf")
+
+def test_parse_udp_message_ignores_invalid_utf8():
+    assert parse_udp_message(b"publish t\xffopic/a va\xfelue") == ("publish", "topic/a", "value")
 
 @pytest.fixture
 def mock_mqtt_client(monkeypatch):
     mock_client = AsyncMock()
     mock_client.publish = AsyncMock()
-    monkeypatch.setattr('loxmqttrelay.udp_handler.mqtt_client', mock_client)
+    monkeypatch.setattr('loxmqttrelay.udp_handler.get_mqtt_client', lambda: mock_client)
     return mock_client
 
 @pytest.mark.asyncio
@@ -159,21 +191,47 @@ async def test_handle_udp_message_with_special_chars(mock_mqtt_client):
         False
     )
 
+@pytest.mark.asyncio
+async def test_handle_udp_message_logs_decoded_bytes(mock_mqtt_client, caplog):
+    # Raw datagrams are logged as text, not as a bytes repr
+    with caplog.at_level("INFO", logger="loxmqttrelay.udp_handler"):
+        await handle_udp_message(b"publish test/topic \xc3\xa4", ("127.0.0.1", 1234))
+
+    assert "UDP IN: ('127.0.0.1', 1234): publish test/topic \u00e4" in caplog.text
+    assert "b'" not in caplog.text
+
 @pytest.mark.asyncio
 async def test_udp_protocol(mock_mqtt_client):
     protocol = UDPProtocol()
+    protocol.connection_made(MagicMock())
     test_data = "publish test/topic test message".encode('utf-8')
     test_addr = ("127.0.0.1", 1234)
     
-    # Call datagram_received and wait for the task to complete
+    # Call datagram_received and wait for the workers to drain the queue
     protocol.datagram_received(test_data, test_addr)
-    await asyncio.sleep(0.1)  # Give time for the async task to complete
+    await asyncio.wait_for(protocol.queue.join(), 1)
     
     mock_mqtt_client.publish.assert_called_once_with(
         "test/topic",
         "test message",
         False
     )
+    protocol.connection_lost(None)
+
+@pytest.mark.asyncio
+async def test_udp_protocol_drops_when_queue_full(mock_mqtt_client):
+    protocol = UDPProtocol()
+    protocol.queue = asyncio.Queue(maxsize=2)
+    for i in range(3):
+        protocol.datagram_received(f"test/topic message{i}".encode('utf-8'), ("127.0.0.1", 1234))
+    assert protocol.queue.qsize() == 2
+
+    # Workers started afterwards still process what was queued
+    protocol.connection_made(MagicMock())
+    await asyncio.wait_for(protocol.queue.join(), 1)
+    assert mock_mqtt_client.publish.await_count == 2
+    protocol.connection_lost(None)
+    assert protocol._workers == []
 
 @pytest.mark.asyncio
 async def test_start_udp_server(mock_mqtt_client):
@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import Mock, patch, MagicMock, AsyncMock
 import os
+import subprocess
 from pathlib import Path
 import asyncio
 import tomlkit
@@ -9,16 +10,16 @@ from typing import AsyncGenerator, Generator, Any
 import types
 
 from loxmqttrelay.main import MQTTRelay
-from loxmqttrelay.config import Config, global_config, AppConfig
-from loxmqttrelay.compatible._loxmqttrelay import MiniserverDataProcessor
+from loxmqttrelay.config import Config, global_config, AppConfig, get_config
+from loxmqttrelay._loxmqttrelay import MiniserverDataProcessor
 
 @pytest.fixture(autouse=True)
 def reset_singletons() -> Generator[None, None, None]:
     """Reset all singletons before and after each test"""
-    Config._instance = None
+    get_config.cache_clear()
     MiniserverDataProcessor._instance = None  # type: ignore
     yield
-    Config._instance = None
+    get_config.cache_clear()
     MiniserverDataProcessor._instance = None  # type: ignore
 
 @pytest.fixture
@@ -26,6 +27,7 @@ def mock_args(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
     """Mock command line arguments"""
     mock_args = MagicMock()
     mock_args.headless = False
+    mock_args.ui_on_demand = False
     mock_args.log_level = "INFO"
     monkeypatch.setattr('loxmqttrelay.utils._args', mock_args)
     return mock_args
@@ -54,7 +56,7 @@ def mock_subprocess() -> Generator[MagicMock, None, None]:
 def mock_mqtt_client(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
     mock_instance = Mock()
     mock_instance.publish = AsyncMock()
-    monkeypatch.setattr('loxmqttrelay.main.mqtt_client', mock_instance)
+    monkeypatch.setattr('loxmqttrelay.main.get_mqtt_client', lambda: mock_instance)
     return mock_instance
 
 @pytest.fixture
@@ -150,6 +152,8 @@ async def test_ui_starts_properly(
     assert call_args[0] == "streamlit"
     assert call_args[1] == "run"
     assert os.path.basename(call_args[2]) == "ui.py"
+    assert mock_subprocess.call_args.kwargs["stdout"] == subprocess.DEVNULL
+    assert mock_subprocess.call_args.kwargs["stderr"] == subprocess.DEVNULL
     
     # Verify UI path is absolute and points to correct file
     ui_path = call_args[2]
@@ -261,6 +265,30 @@ async def test_ui_does_not_start_in_headless_mode(
     # Verify no MQTT messages were published
     mock_mqtt_client.publish.assert_not_called()
 
+@pytest.mark.asyncio
+async def test_ui_starts_on_request_in_headless_mode_when_opted_in(
+    mock_subprocess: MagicMock,
+    mock_mqtt_client: MagicMock,
+    mock_config: AppConfig,
+    mock_data_processor: MagicMock,
+    mock_args: MagicMock,
+    mock_topic: types.SimpleNamespace
+) -> None:
+    # Set headless mode with --ui-on-demand, the UI is not autostarted but can be requested via MQTT
+    mock_args.headless = True
+    mock_args.ui_on_demand = True
+    
+    # Create relay instance
+    relay = MQTTRelay()
+    
+    # Request the UI (as the startui topic does)
+    await relay.start_ui()
+    
+    # Verify Streamlit was started on demand
+    mock_subprocess.assert_called_once()
+    message = mock_mqtt_client.publish.call_args[0][1]  # type: ignore
+    assert "UI started successfully" in message
+
 @pytest.mark.asyncio
 async def test_restart_relay_command(
     mock_mqtt_client: MagicMock,